@@ -0,0 +1,86 @@
+# bench_parsers.py - microbenchmark for the Poketwo message parsers in poketwo.py
+# Run from the repo root: python benchmarks/bench_parsers.py [iterations]
+import os
+import sys
+import timeit
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from poketwo import (
+    classify_message,
+    parse_catch_message,
+    parse_missingno_message,
+    parse_hatch_message,
+    extract_pokemon_from_text
+)
+
+# Recorded message samples (user ids and emoji ids as Poketwo sends them)
+CATCH_SAMPLES = [
+    "Congratulations <@123456789012345678>! You caught a Level 23 Pikachu<:male:1207734081585152101> (87.10%)!",
+    "Congratulations <@123456789012345678>! You caught a Level 7 Hisuian Zorua<:female:1207734084210917436> (4.30%)!",
+    "Congratulations <@!123456789012345678>! You caught a Level 31 Magnemite<:unknown:1207734085854965780>!",
+    "Congratulations <@123456789012345678>! You caught a Level 14 Eevee<:female:1207734084210917436> (62.37%)!\n\n"
+    "These colors seem unusual... ✨\nShiny streak reset. (**412**)",
+    "Congratulations <@123456789012345678>! You caught a Level 40 Gigantamax Charizard<:male:1207734081585152101> (91.40%)!\n\n"
+    "Woah! It seems that this pokémon has the Gigantamax Factor...",
+]
+
+MISSINGNO_SAMPLES = [
+    "Congratulations <@123456789012345678>! You caught a Level ??? MissingNo.<:unknown:1207734085854965780> (???%)!",
+    "Congratulations <@123456789012345678>! You caught a Level ??? MissingNo.<:unknown:1207734085854965780>!\n\n"
+    "These colors seem unusual... ✨",
+]
+
+HATCH_SAMPLES = [
+    "Your <:egg_common:1267101010101010101> **Eevee Egg** has hatched into a **<:_:1236000000000000000> Level 1 Eevee<:female:1207734084210917436> (50.00%)**",
+    "Your <:egg_rare:1267101010101010102> **Dratini Egg** has hatched into a **<:_:1236000000000000001> ✨ Level 1 Dratini<:male:1207734081585152101> (93.55%)**",
+    "Your <:egg_gmax:1267101010101010103> **Gigantamax Meowth Egg** has hatched into a **<:_:1236000000000000002> Level 1 "
+    "<:_:1242455099213877248> Gigantamax Meowth<:male:1207734081585152101> (12.90%)**",
+]
+
+UNBOX_SAMPLE = "\n".join([
+    "- <:_:1236000000000000003> Level 12 Pikachu <:male:1207734081585152101> (40.32%)",
+    "- <:_:1236000000000000004> ✨ Level 25 Rayquaza <:unknown:1207734085854965780> (71.51%)",
+    "- <:_:1236000000000000005> Level 18 Gigantamax Lapras <:female:1207734084210917436> (95.16%)",
+    "- **<:_:1236000000000000006> Level 9 Hisuian Growlithe <:male:1207734081585152101> (8.06%)**",
+    "You also received 250 Pokécoins!",
+] * 2)
+
+def _message(content="", title=None, description=None):
+    embeds = []
+    if title is not None:
+        embeds.append(SimpleNamespace(title=title, description=description, fields=[]))
+    return SimpleNamespace(id=0, content=content, embeds=embeds)
+
+ROUTED_SAMPLES = (
+    [_message(title="A wild pokémon has appeared!")] +
+    [_message(content) for content in CATCH_SAMPLES + MISSINGNO_SAMPLES + HATCH_SAMPLES] +
+    [_message(title="Opening 10 Mystery Boxes", description=UNBOX_SAMPLE)] +
+    [_message("Congratulations <@123456789012345678>! Your Pikachu is now level 24!")]
+)
+
+def bench(label, func, samples, iterations):
+    """Time func over every sample and print the per-call cost"""
+    seconds = timeit.timeit(lambda: [func(sample) for sample in samples], number=iterations)
+    per_call_us = seconds / (iterations * len(samples)) * 1e6
+    print(f"{label:<28} {per_call_us:8.2f} us/call")
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    # Make sure every sample still parses before timing it
+    assert all(parse_catch_message(sample) for sample in CATCH_SAMPLES)
+    assert all(parse_missingno_message(sample) for sample in MISSINGNO_SAMPLES)
+    assert all(parse_hatch_message(sample) for sample in HATCH_SAMPLES)
+    assert len(extract_pokemon_from_text(UNBOX_SAMPLE)) == 8
+
+    print(f"{iterations} iterations per sample set")
+    bench("parse_catch_message", parse_catch_message, CATCH_SAMPLES, iterations)
+    bench("parse_missingno_message", parse_missingno_message, MISSINGNO_SAMPLES, iterations)
+    bench("parse_hatch_message", parse_hatch_message, HATCH_SAMPLES, iterations)
+    bench("extract_pokemon_from_text", extract_pokemon_from_text, [UNBOX_SAMPLE], iterations)
+    bench("classify_message", classify_message, ROUTED_SAMPLES, iterations)
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,14 @@
 import discord
 import math
-import time
 import asyncio
 from discord.ext import commands
+from pokedex import get_pokedex
+from subscriptions import SubscriptionStore
+from config import SUBSCRIPTION_MAX_GUILDS
 from utils import (
-    load_pokemon_data, 
-    find_pokemon_by_name, 
-    find_pokemon_by_name_flexible,
     normalize_pokemon_name,
-    is_rare_pokemon
+    is_rare_pokemon,
+    get_ping_role_mention
 )
 
 class CollectionPaginationView(discord.ui.View):
@@ -63,12 +63,16 @@ class CollectionPaginationView(discord.ui.View):
 class Collection(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        # Performance caching
-        self._collectors_cache = {}
-        self._hunters_cache = {}
-        self._afk_users_cache = {}
-        self._cache_ttl = 60  # 1 minute cache
-        self._cache_timestamps = {}
+        # Materialized per-guild subscriptions - spawn lookups are served from memory
+        self.subscriptions = SubscriptionStore(lambda: self.db, max_guilds=SUBSCRIPTION_MAX_GUILDS)
+
+    async def cog_load(self):
+        """Follow subscription changes made outside the bot"""
+        self.subscriptions.start_watching()
+
+    async def cog_unload(self):
+        """Stop the change stream watcher"""
+        self.subscriptions.stop_watching()
 
     @property
     def db(self):
@@ -76,240 +80,126 @@ class Collection(commands.Cog):
         import __main__
         return getattr(__main__, 'db', None)
 
-    def _is_cache_valid(self, cache_key):
-        """Check if cache entry is still valid"""
-        if cache_key not in self._cache_timestamps:
-            return False
-        return time.time() - self._cache_timestamps[cache_key] < self._cache_ttl
-
-    def _set_cache(self, cache_dict, cache_key, value):
-        """Set cache value with timestamp"""
-        cache_dict[cache_key] = value
-        self._cache_timestamps[cache_key] = time.time()
-
-    def _invalidate_guild_caches(self, guild_id):
-        """Invalidate all caches for a guild"""
-        cache_keys_to_remove = []
-
-        # Find all cache keys for this guild
-        for cache_dict in [self._collectors_cache, self._hunters_cache, self._afk_users_cache]:
-            for key in list(cache_dict.keys()):
-                if f"_{guild_id}_" in key or f"_{guild_id}" == key[-len(str(guild_id))-1:]:
-                    cache_keys_to_remove.append(key)
-                    cache_dict.pop(key, None)
-
-        # Remove timestampss
-        for key in cache_keys_to_remove:
-            self._cache_timestamps.pop(key, None)
+    def _with_suggestions(self, pokedex, invalid_names):
+        """Append the closest valid name to each invalid name (e.g. 'charzard (Charizard?)')"""
+        described = []
+        for name in invalid_names:
+            suggestions = pokedex.suggest(name, limit=1)
+            described.append(f"{name} ({suggestions[0]}?)" if suggestions else name)
+        return described
 
     async def get_collection_afk_users(self, guild_id):
-        """Get list of collection AFK user IDs for a guild with caching"""
-        cache_key = f"collection_afk_{guild_id}"
-
-        if self._is_cache_valid(cache_key) and cache_key in self._afk_users_cache:
-            return self._afk_users_cache[cache_key]
-
+        """Get list of collection AFK user IDs for a guild"""
         if self.db is None:
             return []
 
         try:
-            afk_docs = await self.db.collection_afk_users.find(
-                {"guild_id": guild_id, "afk": True},
-                {"user_id": 1}  # Only fetch user_id field
-            ).to_list(length=None)
-
-            result = [doc['user_id'] for doc in afk_docs]
-            self._set_cache(self._afk_users_cache, cache_key, result)
-            return result
+            guild = await self.subscriptions.get(guild_id)
+            return list(guild.collection_afk)
         except Exception as e:
             print(f"Error getting collection AFK users: {e}")
             return []
 
     async def get_shiny_hunt_afk_users(self, guild_id):
-        """Get list of shiny hunt AFK user IDs for a guild with caching"""
-        cache_key = f"shiny_afk_{guild_id}"
-
-        if self._is_cache_valid(cache_key) and cache_key in self._afk_users_cache:
-            return self._afk_users_cache[cache_key]
-
+        """Get list of shiny hunt AFK user IDs for a guild"""
         if self.db is None:
             return []
 
         try:
-            afk_docs = await self.db.shiny_hunt_afk_users.find(
-                {"guild_id": guild_id, "afk": True},
-                {"user_id": 1}  # Only fetch user_id field
-            ).to_list(length=None)
-
-            result = [doc['user_id'] for doc in afk_docs]
-            self._set_cache(self._afk_users_cache, cache_key, result)
-            return result
+            guild = await self.subscriptions.get(guild_id)
+            return list(guild.shiny_hunt_afk)
         except Exception as e:
             print(f"Error getting shiny hunt AFK users: {e}")
             return []
 
     async def get_collectors_for_pokemon(self, pokemon_name, guild_id):
-        """Get all users who have collected this Pokemon in the given guild (optimized with caching)"""
-        cache_key = f"collectors_{guild_id}_{normalize_pokemon_name(pokemon_name).lower()}"
-
-        if self._is_cache_valid(cache_key) and cache_key in self._collectors_cache:
-            return self._collectors_cache[cache_key]
+        """Get all users who have collected this Pokemon (or its base form) in the given guild
 
+        pokemon_name can be a name or a SpawnTarget from Pokedex.resolve_spawn().
+        """
         if self.db is None:
             return []
 
-        pokemon_data = load_pokemon_data()
-        collectors = []
-        normalized_spawn_name = normalize_pokemon_name(pokemon_name).lower()
+        target = get_pokedex().resolve_spawn(pokemon_name)
 
         try:
-            # Run queries in parallel for better performance
-            afk_users_task = self.get_collection_afk_users(guild_id)
-            collections_task = self.db.collections.find(
-                {"guild_id": guild_id, "pokemon": {"$exists": True, "$ne": []}},
-                {"user_id": 1, "pokemon": 1}
-            ).to_list(length=None)
-
-            collection_afk_users, collections = await asyncio.gather(
-                afk_users_task, collections_task
-            )
-
-            afk_users_set = set(collection_afk_users)  # O(1) lookup
-
-            for collection in collections:
-                user_id = collection['user_id']
-
-                if user_id in afk_users_set:
-                    continue
-
-                user_pokemon = collection.get('pokemon', [])
-
-                # Check direct match first (most common case)
-                if any(normalize_pokemon_name(p).lower() == normalized_spawn_name 
-                       for p in user_pokemon):
-                    collectors.append(user_id)
-                    continue
-
-                # Check for variant matching
-                target_pokemon = find_pokemon_by_name(pokemon_name, pokemon_data)
-                if target_pokemon and target_pokemon.get('is_variant'):
-                    base_form = target_pokemon.get('variant_of')
-                    if base_form:
-                        normalized_base_form = normalize_pokemon_name(base_form).lower()
-                        if any(normalize_pokemon_name(p).lower() == normalized_base_form 
-                               for p in user_pokemon):
-                            if user_id not in collectors:  # Avoid duplicates
-                                collectors.append(user_id)
-
-            self._set_cache(self._collectors_cache, cache_key, collectors)
-
+            guild = await self.subscriptions.get(guild_id)
+            # match_keys already holds the spawn and its base form
+            return guild.collectors_for(target.match_keys)
         except Exception as e:
             print(f"Error getting collectors: {e}")
-
-        return collectors
+            return []
 
     async def get_shiny_hunters_for_pokemon(self, pokemon_name, guild_id):
-        """Get all users hunting this Pokemon in the given guild (optimized with caching)"""
-        cache_key = f"hunters_{guild_id}_{normalize_pokemon_name(pokemon_name).lower()}"
-
-        if self._is_cache_valid(cache_key) and cache_key in self._hunters_cache:
-            return self._hunters_cache[cache_key]
+        """Get all users hunting this Pokemon (or its base form) in the given guild
 
+        pokemon_name can be a name or a SpawnTarget from Pokedex.resolve_spawn().
+        """
         if self.db is None:
             return []
 
-        pokemon_data = load_pokemon_data()
-        hunters = []
-        normalized_spawn_name = normalize_pokemon_name(pokemon_name).lower()
+        target = get_pokedex().resolve_spawn(pokemon_name)
 
         try:
-            # Run queries in parallel
-            afk_users_task = self.get_shiny_hunt_afk_users(guild_id)
-            hunts_task = self.db.shiny_hunts.find(
-                {"guild_id": guild_id, "pokemon": {"$exists": True}},
-                {"user_id": 1, "pokemon": 1}
-            ).to_list(length=None)
-
-            shiny_hunt_afk_users, shiny_hunts = await asyncio.gather(
-                afk_users_task, hunts_task
-            )
-
-            afk_users_set = set(shiny_hunt_afk_users)
-
-            for hunt in shiny_hunts:
-                user_id = hunt['user_id']
-                hunting_pokemon = hunt.get('pokemon')
-
-                if hunting_pokemon:
-                    normalized_hunting_name = normalize_pokemon_name(hunting_pokemon).lower()
-
-                    if normalized_hunting_name == normalized_spawn_name:
-                        if user_id in afk_users_set:
-                            hunters.append(f"{user_id}(AFK)")
-                        else:
-                            hunters.append(f"<@{user_id}>")
-                        continue
-
-                    # Check for variant matching
-                    target_pokemon = find_pokemon_by_name(pokemon_name, pokemon_data)
-                    if target_pokemon and target_pokemon.get('is_variant'):
-                        base_form = target_pokemon.get('variant_of')
-                        if base_form:
-                            normalized_base_form = normalize_pokemon_name(base_form).lower()
-                            if normalized_hunting_name == normalized_base_form:
-                                if user_id in afk_users_set:
-                                    hunters.append(f"{user_id}(AFK)")
-                                else:
-                                    hunters.append(f"<@{user_id}>")
-
-            self._set_cache(self._hunters_cache, cache_key, hunters)
-
+            guild = await self.subscriptions.get(guild_id)
+            # AFK hunters are listed by ID without a ping
+            return [
+                f"{user_id}(AFK)" if is_afk else f"<@{user_id}>"
+                for user_id, is_afk in guild.hunters_for(target.match_keys)
+            ]
         except Exception as e:
             print(f"Error getting shiny hunters: {e}")
-
-        return hunters
+            return []
 
     async def get_rare_collectors(self, guild_id):
-        """Get all users who want rare pings (optimized)"""
+        """Get all users who want rare pings"""
         if self.db is None:
             return []
 
         try:
-            # Run queries in parallel
-            afk_users_task = self.get_collection_afk_users(guild_id)
-            rare_users_task = self.db.rare_pings.find(
-                {"guild_id": guild_id, "enabled": True},
-                {"user_id": 1}
-            ).to_list(length=None)
-
-            collection_afk_users, rare_ping_users = await asyncio.gather(
-                afk_users_task, rare_users_task
-            )
+            guild = await self.subscriptions.get(guild_id)
+            return guild.rare_collectors()
+        except Exception as e:
+            print(f"Error getting rare collectors: {e}")
+            return []
 
-            afk_users_set = set(collection_afk_users)
-            collectors = []
+    async def get_spawn_ping_plan(self, guild_id, pokemon_name):
+        """Everyone to ping for a spawn, answered from the guild's in-memory model
 
-            for rare_ping_doc in rare_ping_users:
-                user_id = rare_ping_doc['user_id']
-                if user_id not in afk_users_set:
-                    collectors.append(user_id)
+        Returns {"hunters": [...], "collectors": [user_ids], "ping_info": str or None}.
+        A guild that isn't loaded yet is read with a single aggregation.
+        """
+        plan = {"hunters": [], "collectors": [], "ping_info": None}
+        if self.db is None:
+            return plan
 
-            return collectors
+        target = get_pokedex().resolve_spawn(pokemon_name)
 
+        try:
+            guild = await self.subscriptions.get(guild_id)
         except Exception as e:
-            print(f"Error getting rare collectors: {e}")
-            return []
+            print(f"Error loading spawn ping plan: {e}")
+            return plan
+
+        plan["hunters"] = [
+            f"{user_id}(AFK)" if is_afk else f"<@{user_id}>"
+            for user_id, is_afk in guild.hunters_for(target.match_keys)
+        ]
+        plan["collectors"] = guild.collectors_for(target.match_keys)
+        plan["ping_info"] = get_ping_role_mention(
+            target.pokemon, guild.settings.get('rare_role_id'), guild.settings.get('regional_role_id')
+        )
+        return plan
 
     async def get_collectors_for_spawn(self, pokemon_name, guild_id):
         """Get all users to ping for a Pokemon spawn (optimized with parallel queries)"""
+        target = get_pokedex().resolve_spawn(pokemon_name)
+
         # Run both queries in parallel
-        regular_collectors_task = self.get_collectors_for_pokemon(pokemon_name, guild_id)
+        regular_collectors_task = self.get_collectors_for_pokemon(target, guild_id)
 
         # Check if this is a rare Pokemon
-        pokemon_data = load_pokemon_data()
-        pokemon = find_pokemon_by_name(pokemon_name, pokemon_data)
-
-        if pokemon and is_rare_pokemon(pokemon):
+        if target.pokemon and is_rare_pokemon(target.pokemon):
             rare_collectors_task = self.get_rare_collectors(guild_id)
             regular_collectors, rare_collectors = await asyncio.gather(
                 regular_collectors_task, rare_collectors_task
@@ -327,15 +217,14 @@ class Collection(commands.Cog):
             return "Database not available", False
 
         try:
-            current_afk = await self.db.collection_afk_users.find_one(
-                {"user_id": user_id, "guild_id": guild_id}
-            )
+            # Current state comes from the in-memory AFK set, no read needed
+            guild = await self.subscriptions.get(guild_id)
 
-            if current_afk and current_afk.get('afk', False):
+            if user_id in guild.collection_afk:
                 await self.db.collection_afk_users.delete_one(
                     {"user_id": user_id, "guild_id": guild_id}
                 )
-                self._invalidate_guild_caches(guild_id)
+                self.subscriptions.record_flag(guild_id, user_id, 'collection_afk', False)
                 return "Collection pings enabled. You will be pinged for Pokemon you have collected.", False
             else:
                 await self.db.collection_afk_users.update_one(
@@ -343,7 +232,7 @@ class Collection(commands.Cog):
                     {"$set": {"user_id": user_id, "guild_id": guild_id, "afk": True}},
                     upsert=True
                 )
-                self._invalidate_guild_caches(guild_id)
+                self.subscriptions.record_flag(guild_id, user_id, 'collection_afk', True)
                 return "Collection pings disabled. You won't be pinged for Pokemon you have collected.", True
         except Exception as e:
             print(f"Error toggling collection AFK status: {e}")
@@ -355,15 +244,14 @@ class Collection(commands.Cog):
             return "Database not available", False
 
         try:
-            current_afk = await self.db.shiny_hunt_afk_users.find_one(
-                {"user_id": user_id, "guild_id": guild_id}
-            )
+            # Current state comes from the in-memory AFK set, no read needed
+            guild = await self.subscriptions.get(guild_id)
 
-            if current_afk and current_afk.get('afk', False):
+            if user_id in guild.shiny_hunt_afk:
                 await self.db.shiny_hunt_afk_users.delete_one(
                     {"user_id": user_id, "guild_id": guild_id}
                 )
-                self._invalidate_guild_caches(guild_id)
+                self.subscriptions.record_flag(guild_id, user_id, 'shiny_hunt_afk', False)
                 return "Shiny hunt pings enabled. You will be pinged for Pokemon you're hunting.", False
             else:
                 await self.db.shiny_hunt_afk_users.update_one(
@@ -371,7 +259,7 @@ class Collection(commands.Cog):
                     {"$set": {"user_id": user_id, "guild_id": guild_id, "afk": True}},
                     upsert=True
                 )
-                self._invalidate_guild_caches(guild_id)
+                self.subscriptions.record_flag(guild_id, user_id, 'shiny_hunt_afk', True)
                 return "Shiny hunt pings disabled. Your ID will be shown but you won't be pinged for Pokemon you're hunting.", True
         except Exception as e:
             print(f"Error toggling shiny hunt AFK status: {e}")
@@ -383,10 +271,8 @@ class Collection(commands.Cog):
             return False
 
         try:
-            afk_doc = await self.db.collection_afk_users.find_one(
-                {"user_id": user_id, "guild_id": guild_id}
-            )
-            return afk_doc and afk_doc.get('afk', False)
+            guild = await self.subscriptions.get(guild_id)
+            return user_id in guild.collection_afk
         except Exception as e:
             print(f"Error checking collection AFK status: {e}")
             return False
@@ -397,10 +283,8 @@ class Collection(commands.Cog):
             return False
 
         try:
-            afk_doc = await self.db.shiny_hunt_afk_users.find_one(
-                {"user_id": user_id, "guild_id": guild_id}
-            )
-            return afk_doc and afk_doc.get('afk', False)
+            guild = await self.subscriptions.get(guild_id)
+            return user_id in guild.shiny_hunt_afk
         except Exception as e:
             print(f"Error checking shiny hunt AFK status: {e}")
             return False
@@ -413,23 +297,31 @@ class Collection(commands.Cog):
         if not pokemon_name:
             return "No Pokemon name provided"
 
-        pokemon_data = load_pokemon_data()
-        if not pokemon_data:
+        pokedex = get_pokedex()
+        if not pokedex.entries:
             return "Pokemon data not available"
 
-        pokemon = find_pokemon_by_name_flexible(pokemon_name, pokemon_data)
+        pokemon = pokedex.find_by_name_flexible(pokemon_name)
 
         if not pokemon or not pokemon.get('name'):
+            suggestions = pokedex.suggest(pokemon_name)
+            if suggestions:
+                return f"Invalid Pokemon name: {pokemon_name}. Did you mean: {', '.join(suggestions)}?"
             return f"Invalid Pokemon name: {pokemon_name}"
 
         try:
             await self.db.shiny_hunts.update_one(
                 {"user_id": user_id, "guild_id": guild_id},
-                {"$set": {"user_id": user_id, "guild_id": guild_id, "pokemon": pokemon['name']}},
+                {"$set": {
+                    "user_id": user_id,
+                    "guild_id": guild_id,
+                    "pokemon": pokemon['name'],
+                    "normalized_pokemon": normalize_pokemon_name(pokemon['name']).lower()
+                }},
                 upsert=True
             )
 
-            self._invalidate_guild_caches(guild_id)
+            self.subscriptions.record_hunt(guild_id, user_id, pokemon['name'])
             return f"Now hunting: **{pokemon['name']}**"
 
         except Exception as e:
@@ -447,7 +339,7 @@ class Collection(commands.Cog):
             )
 
             if result.deleted_count > 0:
-                self._invalidate_guild_caches(guild_id)
+                self.subscriptions.record_hunt(guild_id, user_id, None)
                 return "Shiny hunt cleared successfully"
             else:
                 return "You are not hunting anything"
@@ -483,14 +375,14 @@ class Collection(commands.Cog):
         if not pokemon_names:
             return "No Pokemon names provided"
 
-        pokemon_data = load_pokemon_data()
-        if not pokemon_data:
+        pokedex = get_pokedex()
+        if not pokedex.entries:
             return "Pokemon data not available"
 
         added_pokemon = []
         invalid_pokemon = []
 
-        # Process names efficiently
+        # Resolve every name against the precomputed normalized index, keeping input order
         for name in pokemon_names:
             if not name or not isinstance(name, str):
                 continue
@@ -504,8 +396,7 @@ class Collection(commands.Cog):
                 added_pokemon.append("event")
                 continue
 
-            pokemon = find_pokemon_by_name_flexible(name, pokemon_data)
-
+            pokemon = pokedex.find_by_name_flexible(name)
             if pokemon and pokemon.get('name'):
                 added_pokemon.append(pokemon['name'])
             else:
@@ -514,7 +405,7 @@ class Collection(commands.Cog):
         if not added_pokemon:
             error_msg = "No valid Pokemon names found"
             if invalid_pokemon:
-                error_msg += f". Invalid names: {', '.join(invalid_pokemon[:10])}"
+                error_msg += f". Invalid names: {', '.join(self._with_suggestions(pokedex, invalid_pokemon[:10]))}"
                 if len(invalid_pokemon) > 10:
                     error_msg += f" and {len(invalid_pokemon) - 10} more..."
             return error_msg
@@ -526,7 +417,7 @@ class Collection(commands.Cog):
                 upsert=True
             )
 
-            self._invalidate_guild_caches(guild_id)
+            self.subscriptions.record_collection_add(guild_id, user_id, added_pokemon)
 
             # Format response efficiently
             if len(added_pokemon) <= 150:
@@ -535,10 +426,11 @@ class Collection(commands.Cog):
                 response = f"Added {len(added_pokemon)} Pokemon: {', '.join(added_pokemon[:150])} and {len(added_pokemon) - 150} more..."
 
             if invalid_pokemon:
+                # Only the names actually shown get suggestions
                 if len(invalid_pokemon) <= 30:
-                    response += f"\nInvalid: {', '.join(invalid_pokemon)}"
+                    response += f"\nInvalid: {', '.join(self._with_suggestions(pokedex, invalid_pokemon))}"
                 else:
-                    response += f"\nInvalid: {', '.join(invalid_pokemon[:30])} and {len(invalid_pokemon) - 30} more..."
+                    response += f"\nInvalid: {', '.join(self._with_suggestions(pokedex, invalid_pokemon[:30]))} and {len(invalid_pokemon) - 30} more..."
 
             return response
 
@@ -554,27 +446,12 @@ class Collection(commands.Cog):
         if not pokemon_names:
             return "No Pokemon names provided"
 
-        pokemon_data = load_pokemon_data()
-        if not pokemon_data:
+        pokedex = get_pokedex()
+        if not pokedex.entries:
             return "Pokemon data not available"
 
-        removed_pokemon = []
-        not_found_pokemon = []
-
-        for name in pokemon_names:
-            if not name or not isinstance(name, str):
-                continue
-
-            name = name.strip()
-            if not name:
-                continue
-
-            pokemon = find_pokemon_by_name_flexible(name, pokemon_data)
-
-            if pokemon and pokemon.get('name'):
-                removed_pokemon.append(pokemon['name'])
-            else:
-                not_found_pokemon.append(name)
+        matches, not_found_pokemon = pokedex.resolve_names(pokemon_names)
+        removed_pokemon = [pokemon['name'] for pokemon in matches]
 
         if not removed_pokemon:
             error_msg = "No valid Pokemon names found"
@@ -591,7 +468,7 @@ class Collection(commands.Cog):
             )
 
             if result.modified_count > 0:
-                self._invalidate_guild_caches(guild_id)
+                self.subscriptions.record_collection_remove(guild_id, user_id, removed_pokemon)
 
                 if len(removed_pokemon) <= 150:
                     response = f"Removed {len(removed_pokemon)} Pokemon: {', '.join(removed_pokemon)}"
@@ -623,7 +500,7 @@ class Collection(commands.Cog):
             )
 
             if result.deleted_count > 0:
-                self._invalidate_guild_caches(guild_id)
+                self.subscriptions.record_collection_clear(guild_id, user_id)
                 return "Collection cleared successfully"
             else:
                 return "Your collection is already empty"
@@ -1,15 +1,21 @@
 import discord
-import re
-import json
-import os
 from datetime import datetime
 from discord.ext import commands
 from config import EMBED_COLOR
+from poketwo import POKETWO_ID, parse_hatch_message
+from sprites import get_sprite_catalog
+from settings_cache import get_settings_cache
+from starboard_delivery import get_starboard_delivery
+from message_locator import get_message_locator
 
 class Egg(commands.Cog):
-    def __init__(self, bot):
+    def __init__(self, bot, sprites=None, settings=None, delivery=None):
         self.bot = bot
-        self.pokemon_data = self.load_pokemon_data()
+        # Sprite URLs, guild settings and starboard sends are shared with the other cogs
+        self.sprites = sprites or get_sprite_catalog()
+        self.settings = settings or get_settings_cache()
+        self.delivery = delivery or get_starboard_delivery()
+        self.locator = get_message_locator()
 
     @property
     def db(self):
@@ -17,22 +23,6 @@ class Egg(commands.Cog):
         import __main__
         return getattr(__main__, 'db', None)
 
-    def load_pokemon_data(self):
-        """Load Pokemon data from starboard.txt file"""
-        try:
-            # Try to load from the same directory as the cog
-            starboard_file = os.path.join(os.path.dirname(__file__), '..', 'starboard.txt')
-            if not os.path.exists(starboard_file):
-                # Fallback to current directory
-                starboard_file = 'starboard.txt'
-
-            with open(starboard_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data
-        except Exception as e:
-            print(f"Error loading Pokemon data: {e}")
-            return {}
-
     def get_gender_emoji(self, gender):
         """Get gender emoji based on gender"""
         if gender == 'male':
@@ -46,198 +36,17 @@ class Egg(commands.Cog):
 
     def find_pokemon_image_url(self, pokemon_name, is_shiny=False, gender=None, is_gigantamax=False):
         """Find Pokemon image URL from the loaded data with gender and Gigantamax support"""
-        # Normalize the pokemon name for matching
-        normalized_name = pokemon_name.strip().lower()
-
-        # If it's Gigantamax, search for Gigantamax variant first
-        if is_gigantamax:
-            # First try to find Gigantamax variant
-            gigantamax_name = f"gigantamax {normalized_name}"
-
-            for key, value in self.pokemon_data.items():
-                if key.startswith('variant_') and 'gigantamax' in key.lower():
-                    pokemon_display_name = value.get('name', '').lower()
-                    if gigantamax_name == pokemon_display_name:
-                        base_url = value.get('image_url', '')
-                        if is_shiny and base_url:
-                            # Replace 'images' with 'shiny' for shiny Gigantamax
-                            return base_url.replace('/images/', '/shiny/')
-                        return base_url
-
-        # Function to search for Pokemon with proper female variant handling
-        def search_pokemon(search_name, prefer_female=False):
-            # First, try to find exact match
-            for key, value in self.pokemon_data.items():
-                pokemon_entry_name = value.get('name', '').lower()
-
-                # Handle the case where female variants have "_female" in the name
-                if prefer_female and gender == 'female':
-                    # First try to find female variant
-                    if pokemon_entry_name == f"{search_name}_female":
-                        return value.get('image_url', '')
-
-                # Try exact match with the search name
-                if pokemon_entry_name == search_name:
-                    return value.get('image_url', '')
-
-            # If no exact match, try partial matching
-            for key, value in self.pokemon_data.items():
-                pokemon_entry_name = value.get('name', '').lower()
-
-                # Handle female variants in partial matching
-                if prefer_female and gender == 'female':
-                    if f"{search_name}_female" in pokemon_entry_name or pokemon_entry_name in f"{search_name}_female":
-                        return value.get('image_url', '')
-
-                # Regular partial matching
-                if search_name in pokemon_entry_name or pokemon_entry_name in search_name:
-                    return value.get('image_url', '')
-
-            return None
-
-        # Search for Pokemon image URL
-        base_url = search_pokemon(normalized_name, prefer_female=True)
-
-        # If female variant not found and we were looking for female, try the base name
-        if base_url is None and gender == 'female':
-            base_url = search_pokemon(normalized_name, prefer_female=False)
-
-        if base_url and is_shiny:
-            # Replace 'images' with 'shiny' for shiny Pokemon
-            return base_url.replace('/images/', '/shiny/')
-
-        return base_url
+        return self.sprites.resolve(pokemon_name, is_shiny, gender, is_gigantamax)
 
     async def get_starboard_channel(self, guild_id):
         """Get the starboard channel for a guild"""
-        if self.db is None:
-            return None
-
-        try:
-            guild_settings = await self.db.guild_settings.find_one({"guild_id": guild_id})
-            if guild_settings:
-                return guild_settings.get('starboard_channel_id')
-        except Exception as e:
-            print(f"Error getting starboard channel: {e}")
-        return None
+        guild_settings = await self.settings.get_guild(guild_id)
+        return guild_settings.get('starboard_channel_id')
 
     async def get_global_starboard_channel(self):
         """Get the global starboard channel"""
-        if self.db is None:
-            return None
-
-        try:
-            global_settings = await self.db.global_settings.find_one({"_id": "starboard"})
-            if global_settings:
-                return global_settings.get('global_starboard_channel_id')
-        except Exception as e:
-            print(f"Error getting global starboard channel: {e}")
-        return None
-
-    def parse_poketwo_hatch_message(self, message_content, hatched_by_id=None):
-        """Parse Poketwo egg hatch message to extract relevant information"""
-
-        # Pattern for Gigantamax hatches (with or without shiny)
-        # Format: Your <egg> **Gigantamax Pokemon Egg** has hatched into a **<:_:id> (✨ )?Level X <:_:1242455099213877248> Gigantamax Pokemon<gender> (IV%)**
-        gigantamax_pattern = r"Your <:egg_[^>]+> \*\*Gigantamax (.+?) Egg\*\* has hatched into a \*\*<:_:\d+> (✨ )?Level (\d+) <:_:1242455099213877248> Gigantamax (.+?)(<:[^:]+:\d+>)\s*\((\d+\.?\d*)%\)\*\*"
-
-        # Try Gigantamax pattern first
-        match = re.search(gigantamax_pattern, message_content)
-
-        if match:
-            egg_pokemon = match.group(1).strip()  # Pokemon name from egg (e.g., "Meowth")
-            is_shiny = match.group(2) is not None  # ✨ indicates shiny
-            level = match.group(3)
-            pokemon_name = match.group(4).strip()  # Pokemon name after hatch (e.g., "Meowth")
-            gender_emoji = match.group(5)  # Gender emoji
-            iv_str = match.group(6)
-
-            is_gigantamax = True
-
-            # Extract gender from emoji
-            gender = None
-            if gender_emoji:
-                if 'male:' in gender_emoji and 'female' not in gender_emoji:
-                    gender = 'male'
-                elif 'female:' in gender_emoji:
-                    gender = 'female'
-                elif 'unknown:' in gender_emoji:
-                    gender = 'unknown'
-
-            # Parse IV
-            iv = float(iv_str) if iv_str else "Hidden"
-
-            print(f"DEBUG: Gigantamax hatch parsed - Pokemon: '{pokemon_name}', Gender: '{gender}', Shiny: {is_shiny}, IV: {iv}")
-
-            return {
-                'egg_pokemon': egg_pokemon,
-                'level': level,
-                'pokemon_name': pokemon_name,
-                'iv': iv,
-                'is_shiny': is_shiny,
-                'is_gigantamax': is_gigantamax,
-                'gender': gender,
-                'message_type': 'hatch',
-                'hatched_by_id': hatched_by_id
-            }
-
-        # Pattern for regular hatches (non-Gigantamax)
-        # Format: Your <egg> **Pokemon Egg** has hatched into a **<:_:id> (✨ )?Level X Pokemon<gender> (IV%)?**
-        regular_pattern = r"Your <:egg_[^>]+> \*\*(.+?) Egg\*\* has hatched into a \*\*<:_:\d+> (✨ )?Level (\d+) (.+?)(?:\s+\((\d+\.?\d*)%\))?\*\*"
-
-        match = re.search(regular_pattern, message_content)
-        if not match:
-            # Try pattern without bold formatting (fallback)
-            regular_pattern_no_bold = r"Your <:egg_[^>]+> (.+?) Egg has hatched into a <:_:\d+> (✨ )?Level (\d+) (.+?)(?:\s+\((\d+\.?\d*)%\))?"
-            match = re.search(regular_pattern_no_bold, message_content)
-
-        if not match:
-            return None
-
-        egg_pokemon = match.group(1).strip()
-        is_shiny = match.group(2) is not None  # ✨ indicates shiny
-        level = match.group(3)
-        pokemon_name_with_gender = match.group(4).strip()
-        iv_str = match.group(5)
-
-        # Handle IV - if not present, it's hidden
-        if iv_str:
-            iv = float(iv_str)
-        else:
-            iv = "Hidden"
-
-        # Extract gender from emoji - check the full message content for gender emojis
-        gender = None
-        pokemon_name = pokemon_name_with_gender
-
-        # First, let's check the full message content for gender emojis
-        if re.search(r'<:male:\d+>', message_content):
-            gender = 'male'
-            # Remove gender emoji from pokemon name if it's there
-            pokemon_name = re.sub(r'<:male:\d+>', '', pokemon_name_with_gender).strip()
-        elif re.search(r'<:female:\d+>', message_content):
-            gender = 'female'
-            # Remove gender emoji from pokemon name if it's there
-            pokemon_name = re.sub(r'<:female:\d+>', '', pokemon_name_with_gender).strip()
-        elif re.search(r'<:unknown:\d+>', message_content):
-            gender = 'unknown'
-            # Remove gender emoji from pokemon name if it's there
-            pokemon_name = re.sub(r'<:unknown:\d+>', '', pokemon_name_with_gender).strip()
-
-        # Debug print to help troubleshoot
-        print(f"DEBUG: Regular hatch parsed - Pokemon: '{pokemon_name}', Gender: '{gender}', Full captured: '{pokemon_name_with_gender}'")
-
-        return {
-            'egg_pokemon': egg_pokemon,
-            'level': level,
-            'pokemon_name': pokemon_name,
-            'iv': iv,
-            'is_shiny': is_shiny,
-            'is_gigantamax': False,
-            'gender': gender,
-            'message_type': 'hatch',
-            'hatched_by_id': hatched_by_id
-        }
+        global_settings = await self.settings.get_global()
+        return global_settings.get('global_starboard_channel_id')
 
     async def get_hatched_by_user(self, message):
         """Get who hatched the egg from the reply"""
@@ -332,7 +141,10 @@ class Egg(commands.Cog):
         return embed, view
 
     async def send_to_starboard_channels(self, guild, hatch_data, original_message=None):
-        """Send hatch data to appropriate starboard channels"""
+        """Send hatch data to appropriate starboard channels
+
+        Returns how many posts were queued or sent (0 if nothing new went out).
+        """
         is_shiny = hatch_data['is_shiny']
         is_gigantamax = hatch_data['is_gigantamax']
         iv = hatch_data['iv']
@@ -382,24 +194,16 @@ class Egg(commands.Cog):
 
         # If no criteria met, don't send
         if embed_type is None:
-            return
+            return 0
 
         # Create the embed
         embed, view = self.create_hatch_embed(hatch_data, embed_type, original_message)
 
-        # Send to server starboard if configured
-        if server_starboard_channel:
-            try:
-                await server_starboard_channel.send(embed=embed, view=view)
-            except Exception as e:
-                print(f"Error sending to server starboard: {e}")
-
-        # Send to global starboard if configured
-        if global_starboard_channel:
-            try:
-                await global_starboard_channel.send(embed=embed, view=view)
-            except Exception as e:
-                print(f"Error sending to global starboard: {e}")
+        # Server and global starboards are sent to concurrently
+        return await self.delivery.deliver(
+            (server_starboard_channel, global_starboard_channel), [(embed, view)],
+            source_message_id=original_message.id if original_message else None
+        )
 
     @commands.command(name="eggcheck")
     @commands.has_permissions(administrator=True)
@@ -436,29 +240,17 @@ class Egg(commands.Cog):
             if input_data.strip().isdigit():
                 message_id = int(input_data.strip())
                 try:
-                    # Try to fetch the message from the current channel first
-                    try:
-                        original_message = await ctx.channel.fetch_message(message_id)
-                    except discord.NotFound:
-                        # If not found in current channel, search in all channels in the guild
-                        found_message = None
-                        for channel in ctx.guild.text_channels:
-                            if channel.permissions_for(ctx.guild.me).read_message_history:
-                                try:
-                                    found_message = await channel.fetch_message(message_id)
-                                    original_message = found_message
-                                    break
-                                except (discord.NotFound, discord.Forbidden):
-                                    continue
-
-                        if not found_message:
-                            await ctx.reply(f"❌ Could not find message with ID `{message_id}` in this server.")
-                            return
+                    # Recently seen messages need no fetch, otherwise try the current channel
+                    # and then search the rest of the server concurrently
+                    original_message = await self.locator.find(ctx.guild, message_id, first_channel=ctx.channel)
+                    if original_message is None:
+                        await ctx.reply(f"❌ Could not find message with ID `{message_id}` in this server.")
+                        return
 
                     hatch_message = original_message.content
 
                     # Check if the message is from Poketwo
-                    if original_message.author.id != 716390085896962058:
+                    if original_message.author.id != POKETWO_ID:
                         await ctx.reply(f"❌ The message with ID `{message_id}` is not from Poketwo.")
                         return
 
@@ -479,7 +271,7 @@ class Egg(commands.Cog):
                 hatch_message = input_data
 
         # Try to parse as hatch message
-        hatch_data = self.parse_poketwo_hatch_message(hatch_message, hatched_by_id)
+        hatch_data = parse_hatch_message(hatch_message, hatched_by_id)
 
         if not hatch_data:
             await ctx.reply("❌ Invalid message format. Please make sure it's a proper Poketwo egg hatch message.")
@@ -525,7 +317,7 @@ class Egg(commands.Cog):
             return
 
         # Send to starboard
-        await self.send_to_starboard_channels(ctx.guild, hatch_data, original_message)
+        sent = await self.send_to_starboard_channels(ctx.guild, hatch_data, original_message)
 
         criteria_text = ", ".join(criteria_met)
         # Format IV for success message
@@ -550,6 +342,11 @@ class Egg(commands.Cog):
         gender_emoji = self.get_gender_emoji(gender)
         pokemon_display = f"{pokemon_name} {gender_emoji}" if gender_emoji else pokemon_name
 
+        if not sent:
+            await ctx.reply(f"ℹ️ This hatch was already posted to the starboard, nothing new was sent.\n"
+                           f"**Pokémon:** {pokemon_display} (Level {level}, {iv_display}){debug_info}")
+            return
+
         await ctx.reply(f"✅ Hatch sent to starboard!\n"
                        f"**Criteria met:** {criteria_text}\n"
                        f"**Pokémon:** {pokemon_display} (Level {level}, {iv_display}){debug_info}")
@@ -564,33 +361,23 @@ class Egg(commands.Cog):
             await ctx.reply("❌ An unexpected error occurred. Please try again.")
 
     @commands.Cog.listener()
-    async def on_message(self, message):
-        """Listen for Poketwo hatch messages"""
-        # Only process messages from Poketwo
-        if message.author.id != 716390085896962058:
-            return
-
-        # Check if it's a hatch message - more flexible detection
-        if "has hatched into" in message.content and "Egg" in message.content:
-            # Get the user who hatched the egg from the reply
-            hatched_by_id = await self.get_hatched_by_user(message)
-            hatch_data = self.parse_poketwo_hatch_message(message.content, hatched_by_id)
+    async def on_poketwo_hatch(self, event):
+        """Send hatches that meet the starboard criteria"""
+        hatch_data = event.data
 
-            if not hatch_data:
-                print(f"DEBUG: Failed to parse hatch message: {message.content[:100]}...")
-                return
-
-            # Check if this hatch is worthy of starboard
-            is_shiny = hatch_data['is_shiny']
-            is_gigantamax = hatch_data['is_gigantamax']
-            iv = hatch_data['iv']
+        # Check if this hatch is worthy of starboard
+        is_shiny = hatch_data['is_shiny']
+        is_gigantamax = hatch_data['is_gigantamax']
+        iv = hatch_data['iv']
 
-            print(f"DEBUG: Hatch detected - Shiny: {is_shiny}, Gigantamax: {is_gigantamax}, IV: {iv}")
+        print(f"DEBUG: Hatch detected - Shiny: {is_shiny}, Gigantamax: {is_gigantamax}, IV: {iv}")
 
-            # Check criteria: shiny, gigantamax, or rare IV
-            if is_shiny or is_gigantamax or (isinstance(iv, (int, float)) and (iv >= 90 or iv <= 10)):
-                print(f"DEBUG: Sending to starboard - Pokemon: {hatch_data['pokemon_name']}")
-                await self.send_to_starboard_channels(message.guild, hatch_data, message)
+        # Check criteria: shiny, gigantamax, or rare IV
+        if is_shiny or is_gigantamax or (isinstance(iv, (int, float)) and (iv >= 90 or iv <= 10)):
+            # Only look up who hatched the egg once it's worth posting
+            hatch_data['hatched_by_id'] = await self.get_hatched_by_user(event.message)
+            print(f"DEBUG: Sending to starboard - Pokemon: {hatch_data['pokemon_name']}")
+            await self.send_to_starboard_channels(event.message.guild, hatch_data, event.message)
 
 async def setup(bot):
     await bot.add_cog(Egg(bot))
@@ -1,13 +1,12 @@
 import discord
-import time
 import asyncio
 from discord.ext import commands
+from pokedex import get_pokedex
+from settings_cache import get_settings_cache
 from utils import (
-    load_pokemon_data,
-    find_pokemon_by_name,
     format_pokemon_prediction,
     get_image_url_from_message,
-    is_rare_pokemon
+    get_ping_role_mention
 )
 
 
@@ -117,12 +116,10 @@ class AFKView(discord.ui.View):
 
 
 class General(commands.Cog):
-    def __init__(self, bot):
+    def __init__(self, bot, settings=None):
         self.bot = bot
-        # Cache for guild settings to reduce database queries
-        self._guild_settings_cache = {}
-        self._cache_timestamps = {}
-        self._cache_ttl = 300  # 5 minutes
+        # Guild settings are cached once for every cog, not per cog
+        self.settings = settings or get_settings_cache()
 
     @property
     def db(self):
@@ -143,36 +140,16 @@ class General(commands.Cog):
         return getattr(__main__, 'http_session', None)
 
     # ===== UTILITY METHODS =====
-    def _is_cache_valid(self, guild_id):
-        """Check if guild settings cache is still valid"""
-        if guild_id not in self._cache_timestamps:
-            return False
-        return time.time() - self._cache_timestamps[guild_id] < self._cache_ttl
-
     async def get_guild_ping_roles(self, guild_id):
-        """Get the rare and regional ping roles for a guild with caching"""
-        # Check cache first
-        if self._is_cache_valid(guild_id) and guild_id in self._guild_settings_cache:
-            cached_settings = self._guild_settings_cache[guild_id]
-            return cached_settings.get('rare_role_id'), cached_settings.get('regional_role_id')
-
-        if self.db is None:
-            return None, None
+        """Get the rare and regional ping roles for a guild (cached)"""
+        guild_settings = await self.settings.get_guild(guild_id)
+        return guild_settings.get('rare_role_id'), guild_settings.get('regional_role_id')
 
-        try:
-            guild_settings = await self.db.guild_settings.find_one({"guild_id": guild_id})
-            if guild_settings:
-                # Update cache
-                self._guild_settings_cache[guild_id] = guild_settings
-                self._cache_timestamps[guild_id] = time.time()
-                return guild_settings.get('rare_role_id'), guild_settings.get('regional_role_id')
-        except Exception as e:
-            print(f"Error getting guild ping roles: {e}")
-
-        # Cache empty result to avoid repeated database queries
-        self._guild_settings_cache[guild_id] = {}
-        self._cache_timestamps[guild_id] = time.time()
-        return None, None
+    def _record_settings(self, guild_id, **fields):
+        """Keep the spawn ping model's copy of the guild settings current"""
+        collection_cog = self.bot.get_cog('Collection')
+        if collection_cog:
+            collection_cog.subscriptions.record_settings(guild_id, **fields)
 
     async def set_rare_role(self, guild_id, role_id):
         """Set the rare Pokemon ping role for a guild"""
@@ -180,14 +157,8 @@ class General(commands.Cog):
             return "Database not available"
 
         try:
-            result = await self.db.guild_settings.update_one(
-                {"guild_id": guild_id},
-                {"$set": {"rare_role_id": role_id}},
-                upsert=True
-            )
-            # Invalidate cache
-            self._guild_settings_cache.pop(guild_id, None)
-            self._cache_timestamps.pop(guild_id, None)
+            await self.settings.set_guild(guild_id, rare_role_id=role_id)
+            self._record_settings(guild_id, rare_role_id=role_id)
             return "Rare role set successfully!"
         except Exception as e:
             print(f"Error setting rare role: {e}")
@@ -199,40 +170,39 @@ class General(commands.Cog):
             return "Database not available"
 
         try:
-            result = await self.db.guild_settings.update_one(
-                {"guild_id": guild_id},
-                {"$set": {"regional_role_id": role_id}},
-                upsert=True
-            )
-            # Invalidate cache
-            self._guild_settings_cache.pop(guild_id, None)
-            self._cache_timestamps.pop(guild_id, None)
+            await self.settings.set_guild(guild_id, regional_role_id=role_id)
+            self._record_settings(guild_id, regional_role_id=role_id)
             return "Regional role set successfully!"
         except Exception as e:
             print(f"Error setting regional role: {e}")
             return f"Database error: {str(e)[:100]}"
 
     async def get_pokemon_ping_info(self, pokemon_name, guild_id):
-        """Get ping information for a Pokemon based on its rarity"""
+        """Get ping information for a Pokemon based on its rarity (name or SpawnTarget)"""
         if self.db is None:
             return None
 
-        pokemon_data = load_pokemon_data()
-        pokemon = find_pokemon_by_name(pokemon_name, pokemon_data)
+        pokemon = get_pokedex().resolve_spawn(pokemon_name).pokemon
 
         if not pokemon:
             return None
 
         rare_role_id, regional_role_id = await self.get_guild_ping_roles(guild_id)
+        return get_ping_role_mention(pokemon, rare_role_id, regional_role_id)
 
-        if is_rare_pokemon(pokemon) and rare_role_id:
-            return f"Rare Ping: <@&{rare_role_id}>"
+    def _format_ping_plan(self, plan):
+        """Format the hunter, collector and role ping lines of a spawn ping plan"""
+        lines = ""
+        if plan["hunters"]:
+            lines += f"\nShiny Hunters: {' '.join(plan['hunters'])}"
 
-        rarity = pokemon.get('rarity', '').lower()
-        if rarity == "regional" and regional_role_id:
-            return f"Regional Ping: <@&{regional_role_id}>"
+        if plan["collectors"]:
+            collector_mentions = " ".join([f"<@{user_id}>" for user_id in plan["collectors"]])
+            lines += f"\nCollectors: {collector_mentions}"
 
-        return None
+        if plan["ping_info"]:
+            lines += f"\n{plan['ping_info']}"
+        return lines
 
     async def _predict_pokemon(self, image_url, ctx):
         """Helper method for Pokemon prediction with optimized async handling"""
@@ -251,29 +221,11 @@ class General(commands.Cog):
 
             formatted_output = format_pokemon_prediction(name, confidence)
 
-            # Get ping information concurrently
+            # Get everyone to ping in one lookup
             collection_cog = self.bot.get_cog('Collection')
             if collection_cog:
-                # Run database queries concurrently
-                hunters_task = collection_cog.get_shiny_hunters_for_pokemon(name, ctx.guild.id)
-                collectors_task = collection_cog.get_collectors_for_pokemon(name, ctx.guild.id)
-                ping_info_task = self.get_pokemon_ping_info(name, ctx.guild.id)
-
-                hunters, collectors, ping_info = await asyncio.gather(
-                    hunters_task, collectors_task, ping_info_task,
-                    return_exceptions=True
-                )
-
-                # Handle results safely
-                if isinstance(hunters, list) and hunters:
-                    formatted_output += f"\nShiny Hunters: {' '.join(hunters)}"
-
-                if isinstance(collectors, list) and collectors:
-                    collector_mentions = " ".join([f"<@{user_id}>" for user_id in collectors])
-                    formatted_output += f"\nCollectors: {collector_mentions}"
-
-                if isinstance(ping_info, str) and ping_info:
-                    formatted_output += f"\n{ping_info}"
+                plan = await collection_cog.get_spawn_ping_plan(ctx.guild.id, name)
+                formatted_output += self._format_ping_plan(plan)
 
             return formatted_output
 
@@ -372,92 +324,62 @@ class General(commands.Cog):
 
     # ===== EVENT LISTENERS =====
     @commands.Cog.listener()
-    async def on_message(self, message):
-        """Handle auto-detection of Poketwo spawns with optimized processing"""
-        # Don't respond to the bot's own messages
-        if message.author == self.bot.user:
-            return
+    async def on_poketwo_spawn(self, event):
+        """Handle auto-detection of Poketwo spawns (classified by the Poketwo router)"""
+        message = event.message
 
         # Check if predictor is available
         if self.predictor is None:
             return
 
-        # Auto-detect Poketwo spawns
-        if message.author.id == 716390085896962058:  # Poketwo user ID
-            # Check if message has embeds with the specific titles
-            if message.embeds:
-                embed = message.embeds[0]
-                if embed.title:
-                    # Check for spawn embed titles
-                    if (embed.title == "A wild pokémon has appeared!" or 
-                        (embed.title.endswith("A new wild pokémon has appeared!") and 
-                         "fled." in embed.title)):
-
-                        image_url = await get_image_url_from_message(message)
-
-                        if image_url:
-                            try:
-                                # Use async prediction
-                                name, confidence = await self.predictor.predict(image_url, self.http_session)
-
-                                if name and confidence:
-                                    # Parse confidence
-                                    confidence_str = str(confidence).rstrip('%')
-                                    try:
-                                        confidence_value = float(confidence_str)
-
-                                        # Handle high confidence predictions (>= 80%)
-                                        if confidence_value >= 55.0:
-                                            formatted_output = format_pokemon_prediction(name, confidence)
-
-                                            # Get all ping information concurrently
-                                            collection_cog = self.bot.get_cog('Collection')
-                                            if collection_cog:
-                                                tasks = [
-                                                    collection_cog.get_shiny_hunters_for_pokemon(name, message.guild.id),
-                                                    collection_cog.get_collectors_for_pokemon(name, message.guild.id),
-                                                    self.get_pokemon_ping_info(name, message.guild.id)
-                                                ]
-
-                                                results = await asyncio.gather(*tasks, return_exceptions=True)
-                                                hunters, collectors, ping_info = results
-
-                                                # Handle results safely
-                                                if isinstance(hunters, list) and hunters:
-                                                    formatted_output += f"\nShiny Hunters: {' '.join(hunters)}"
-
-                                                if isinstance(collectors, list) and collectors:
-                                                    collector_mentions = " ".join([f"<@{user_id}>" for user_id in collectors])
-                                                    formatted_output += f"\nCollectors: {collector_mentions}"
-
-                                                if isinstance(ping_info, str) and ping_info:
-                                                    formatted_output += f"\n{ping_info}"
-
-                                            await message.reply(formatted_output)
-
-                                        # Handle low confidence predictions (< 80%) - Event Pokemon
-                                        else:
-                                            formatted_output = f"Event Pokemon: {confidence}"
-
-                                            # Get collectors who added "event" to their collection
-                                            collection_cog = self.bot.get_cog('Collection')
-                                            if collection_cog:
-                                                try:
-                                                    event_collectors = await collection_cog.get_collectors_for_pokemon("event", message.guild.id)
-
-                                                    if isinstance(event_collectors, list) and event_collectors:
-                                                        collector_mentions = " ".join([f"<@{user_id}>" for user_id in event_collectors])
-                                                        formatted_output += f"\nCollectors: {collector_mentions}"
-                                                except Exception as e:
-                                                    print(f"Error getting event collectors: {e}")
-
-                                            await message.reply(formatted_output)
-                                            print(f"Low confidence prediction sent: Event Pokemon ({confidence})")
-
-                                    except ValueError:
-                                        print(f"Could not parse confidence value: {confidence}")
-                            except Exception as e:
-                                print(f"Auto-detection error: {e}")
+        image_url = await get_image_url_from_message(message)
+
+        if image_url:
+            try:
+                # Use async prediction
+                name, confidence = await self.predictor.predict(image_url, self.http_session)
+
+                if name and confidence:
+                    # Parse confidence
+                    confidence_str = str(confidence).rstrip('%')
+                    try:
+                        confidence_value = float(confidence_str)
+
+                        # Handle high confidence predictions (>= 80%)
+                        if confidence_value >= 55.0:
+                            formatted_output = format_pokemon_prediction(name, confidence)
+
+                            # Get everyone to ping in one lookup
+                            collection_cog = self.bot.get_cog('Collection')
+                            if collection_cog:
+                                plan = await collection_cog.get_spawn_ping_plan(message.guild.id, name)
+                                formatted_output += self._format_ping_plan(plan)
+
+                            await message.reply(formatted_output)
+
+                        # Handle low confidence predictions (< 80%) - Event Pokemon
+                        else:
+                            formatted_output = f"Event Pokemon: {confidence}"
+
+                            # Get collectors who added "event" to their collection
+                            collection_cog = self.bot.get_cog('Collection')
+                            if collection_cog:
+                                try:
+                                    event_collectors = await collection_cog.get_collectors_for_pokemon("event", message.guild.id)
+
+                                    if isinstance(event_collectors, list) and event_collectors:
+                                        collector_mentions = " ".join([f"<@{user_id}>" for user_id in event_collectors])
+                                        formatted_output += f"\nCollectors: {collector_mentions}"
+                                except Exception as e:
+                                    print(f"Error getting event collectors: {e}")
+
+                            await message.reply(formatted_output)
+                            print(f"Low confidence prediction sent: Event Pokemon ({confidence})")
+
+                    except ValueError:
+                        print(f"Could not parse confidence value: {confidence}")
+            except Exception as e:
+                print(f"Auto-detection error: {e}")
 
 
 async def setup(bot):
@@ -0,0 +1,40 @@
+from discord.ext import commands
+from poketwo import POKETWO_ID, classify_message
+from message_locator import get_message_locator
+
+class PoketwoRouter(commands.Cog):
+    """Classifies every Poketwo message once and dispatches a typed event for it
+
+    Cogs subscribe with listeners named after the event kind, e.g.
+    on_poketwo_spawn(event), on_poketwo_catch(event), on_poketwo_missingno(event),
+    on_poketwo_unbox(event) and on_poketwo_hatch(event).
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        # Check commands look routed messages up here instead of fetching them
+        self.locator = get_message_locator()
+
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        """Route Poketwo messages to the cogs that handle them"""
+        if message.author.id != POKETWO_ID:
+            return
+
+        try:
+            event = classify_message(message)
+        except Exception as e:
+            print(f"Error classifying Poketwo message: {e}")
+            return
+
+        if event is not None:
+            self.locator.remember(message)
+            self.bot.dispatch(f"poketwo_{event.kind}", event)
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload):
+        """Don't hand check commands a message that no longer exists"""
+        self.locator.forget(payload.message_id)
+
+async def setup(bot):
+    await bot.add_cog(PoketwoRouter(bot))
@@ -1,15 +1,21 @@
 import discord
-import re
-import json
-import os
 from datetime import datetime
 from discord.ext import commands
 from config import EMBED_COLOR
+from poketwo import POKETWO_ID, parse_catch_message, parse_missingno_message
+from sprites import get_sprite_catalog
+from settings_cache import get_settings_cache
+from starboard_delivery import get_starboard_delivery
+from message_locator import get_message_locator
 
 class Starboard(commands.Cog):
-    def __init__(self, bot):
+    def __init__(self, bot, sprites=None, settings=None, delivery=None):
         self.bot = bot
-        self.pokemon_data = self.load_pokemon_data()
+        # Sprite URLs, guild settings and starboard sends are shared with the other cogs
+        self.sprites = sprites or get_sprite_catalog()
+        self.settings = settings or get_settings_cache()
+        self.delivery = delivery or get_starboard_delivery()
+        self.locator = get_message_locator()
 
     @property
     def db(self):
@@ -17,22 +23,6 @@ class Starboard(commands.Cog):
         import __main__
         return getattr(__main__, 'db', None)
 
-    def load_pokemon_data(self):
-        """Load Pokemon data from starboard.txt file"""
-        try:
-            # Try to load from the same directory as the cog
-            starboard_file = os.path.join(os.path.dirname(__file__), '..', 'starboard.txt')
-            if not os.path.exists(starboard_file):
-                # Fallback to current directory
-                starboard_file = 'starboard.txt'
-
-            with open(starboard_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data
-        except Exception as e:
-            print(f"Error loading Pokemon data: {e}")
-            return {}
-
     def get_gender_emoji(self, gender):
         """Get gender emoji based on gender"""
         if gender == 'male':
@@ -46,82 +36,7 @@ class Starboard(commands.Cog):
 
     def find_pokemon_image_url(self, pokemon_name, is_shiny=False, gender=None, is_gigantamax=False):
         """Find Pokemon image URL from the loaded data with gender and Gigantamax support"""
-        # Normalize the pokemon name for matching
-        normalized_name = pokemon_name.strip().lower()
-
-        # Special case for Eternatus - use "eternamax" instead of "gigantamax" when it has gigantamax factor
-        if is_gigantamax and normalized_name == "eternatus":
-            # Search for Eternamax variant
-            eternamax_name = "eternamax eternatus"
-
-            for key, value in self.pokemon_data.items():
-                if key.startswith('variant_') and 'eternamax' in key.lower():
-                    pokemon_display_name = value.get('name', '').lower()
-                    if eternamax_name == pokemon_display_name:
-                        base_url = value.get('image_url', '')
-                        if is_shiny and base_url:
-                            # Replace 'images' with 'shiny' for shiny Eternamax
-                            return base_url.replace('/images/', '/shiny/')
-                        return base_url
-
-        # If it's Gigantamax (but not Eternatus), search for Gigantamax variant first
-        elif is_gigantamax:
-            # First try to find Gigantamax variant
-            gigantamax_name = f"gigantamax {normalized_name}"
-
-            for key, value in self.pokemon_data.items():
-                if key.startswith('variant_') and 'gigantamax' in key.lower():
-                    pokemon_display_name = value.get('name', '').lower()
-                    if gigantamax_name == pokemon_display_name:
-                        base_url = value.get('image_url', '')
-                        if is_shiny and base_url:
-                            # Replace 'images' with 'shiny' for shiny Gigantamax
-                            return base_url.replace('/images/', '/shiny/')
-                        return base_url
-
-        # Function to search for Pokemon with proper female variant handling
-        def search_pokemon(search_name, prefer_female=False):
-            # First, try to find exact match
-            for key, value in self.pokemon_data.items():
-                pokemon_entry_name = value.get('name', '').lower()
-
-                # Handle the case where female variants have "_female" in the name
-                if prefer_female and gender == 'female':
-                    # First try to find female variant
-                    if pokemon_entry_name == f"{search_name}_female":
-                        return value.get('image_url', '')
-
-                # Try exact match with the search name
-                if pokemon_entry_name == search_name:
-                    return value.get('image_url', '')
-
-            # If no exact match, try partial matching
-            for key, value in self.pokemon_data.items():
-                pokemon_entry_name = value.get('name', '').lower()
-
-                # Handle female variants in partial matching
-                if prefer_female and gender == 'female':
-                    if f"{search_name}_female" in pokemon_entry_name or pokemon_entry_name in f"{search_name}_female":
-                        return value.get('image_url', '')
-
-                # Regular partial matching
-                if search_name in pokemon_entry_name or pokemon_entry_name in search_name:
-                    return value.get('image_url', '')
-
-            return None
-
-        # Search for Pokemon image URL
-        base_url = search_pokemon(normalized_name, prefer_female=True)
-
-        # If female variant not found and we were looking for female, try the base name
-        if base_url is None and gender == 'female':
-            base_url = search_pokemon(normalized_name, prefer_female=False)
-
-        if base_url and is_shiny:
-            # Replace 'images' with 'shiny' for shiny Pokemon
-            return base_url.replace('/images/', '/shiny/')
-
-        return base_url
+        return self.sprites.resolve(pokemon_name, is_shiny, gender, is_gigantamax)
 
     async def set_starboard_channel(self, guild_id, channel_id):
         """Set the starboard channel for a guild"""
@@ -129,11 +44,7 @@ class Starboard(commands.Cog):
             return "Database not available"
 
         try:
-            await self.db.guild_settings.update_one(
-                {"guild_id": guild_id},
-                {"$set": {"starboard_channel_id": channel_id}},
-                upsert=True
-            )
+            await self.settings.set_guild(guild_id, starboard_channel_id=channel_id)
             return "Starboard channel set successfully!"
         except Exception as e:
             print(f"Error setting starboard channel: {e}")
@@ -145,11 +56,7 @@ class Starboard(commands.Cog):
             return "Database not available"
 
         try:
-            await self.db.global_settings.update_one(
-                {"_id": "starboard"},
-                {"$set": {"global_starboard_channel_id": channel_id}},
-                upsert=True
-            )
+            await self.settings.set_global(global_starboard_channel_id=channel_id)
             return "Global starboard channel set successfully!"
         except Exception as e:
             print(f"Error setting global starboard channel: {e}")
@@ -157,150 +64,22 @@ class Starboard(commands.Cog):
 
     async def get_starboard_channel(self, guild_id):
         """Get the starboard channel for a guild"""
-        if self.db is None:
-            return None
-
-        try:
-            guild_settings = await self.db.guild_settings.find_one({"guild_id": guild_id})
-            if guild_settings:
-                return guild_settings.get('starboard_channel_id')
-        except Exception as e:
-            print(f"Error getting starboard channel: {e}")
-        return None
+        guild_settings = await self.settings.get_guild(guild_id)
+        return guild_settings.get('starboard_channel_id')
 
     async def get_global_starboard_channel(self):
         """Get the global starboard channel"""
-        if self.db is None:
-            return None
-
-        try:
-            global_settings = await self.db.global_settings.find_one({"_id": "starboard"})
-            if global_settings:
-                return global_settings.get('global_starboard_channel_id')
-        except Exception as e:
-            print(f"Error getting global starboard channel: {e}")
-        return None
+        global_settings = await self.settings.get_global()
+        return global_settings.get('global_starboard_channel_id')
 
     async def get_server_settings(self, guild_id):
         """Get server settings including rare role, regional role, and starboard channel"""
-        if self.db is None:
-            return None, None, None
-
-        try:
-            guild_settings = await self.db.guild_settings.find_one({"guild_id": guild_id})
-            if guild_settings:
-                return (
-                    guild_settings.get('rare_role_id'),
-                    guild_settings.get('regional_role_id'),
-                    guild_settings.get('starboard_channel_id')
-                )
-        except Exception as e:
-            print(f"Error getting server settings: {e}")
-        return None, None, None
-
-    def parse_poketwo_catch_message(self, message_content):
-        """Parse Poketwo catch message to extract relevant information"""
-        # Updated pattern to properly capture everything including gender emoji
-        catch_pattern = r"Congratulations <@!?(\d+)>! You caught a Level (\d+) (.+?)(?:\s+\((\d+\.?\d*)%\))?!"
-
-        match = re.search(catch_pattern, message_content)
-        if not match:
-            return None
-
-        user_id = match.group(1)
-        level = match.group(2)
-        pokemon_name_with_gender = match.group(3).strip()
-        iv_str = match.group(4)  # This could be None if IV is hidden
-
-        # Handle IV - if not present, it's hidden
-        if iv_str:
-            # Keep the original string format to preserve trailing zeros
-            iv = iv_str
-        else:
-            iv = "Hidden"
-
-        # Extract gender from emoji - check the entire message content for gender emojis
-        gender = None
-        pokemon_name = pokemon_name_with_gender
-
-        # First, let's check the full message content for gender emojis
-        if re.search(r'<:male:\d+>', message_content):
-            gender = 'male'
-            # Remove gender emoji from pokemon name if it's there
-            pokemon_name = re.sub(r'<:male:\d+>', '', pokemon_name_with_gender).strip()
-        elif re.search(r'<:female:\d+>', message_content):
-            gender = 'female'
-            # Remove gender emoji from pokemon name if it's there
-            pokemon_name = re.sub(r'<:female:\d+>', '', pokemon_name_with_gender).strip()
-        elif re.search(r'<:unknown:\d+>', message_content):
-            gender = 'unknown'
-            # Remove gender emoji from pokemon name if it's there
-            pokemon_name = re.sub(r'<:unknown:\d+>', '', pokemon_name_with_gender).strip()
-
-
-        # Check for shiny
-        is_shiny = "These colors seem unusual... ✨" in message_content
-
-        # Check for gigantamax
-        is_gigantamax = "Woah! It seems that this pokémon has the Gigantamax Factor..." in message_content
-
-        # Check for shiny streak reset
-        shiny_chain = None
-        chain_pattern = r"Shiny streak reset\. \(\*\*(\d+)\*\*\)"
-        chain_match = re.search(chain_pattern, message_content)
-        if chain_match:
-            shiny_chain = chain_match.group(1)
-
-        return {
-            'user_id': user_id,
-            'level': level,
-            'pokemon_name': pokemon_name,
-            'iv': iv,
-            'is_shiny': is_shiny,
-            'is_gigantamax': is_gigantamax,
-            'shiny_chain': shiny_chain,
-            'gender': gender,
-            'message_type': 'catch'
-        }
-
-    def parse_poketwo_missingno_message(self, message_content):
-        """Parse Poketwo MissingNo. catch message"""
-        # Pattern for MissingNo. with IV
-        missingno_pattern1 = r"Congratulations <@!?(\d+)>! You caught a Level \?\?\? MissingNo\.(?:<:[^:]+:\d+>)? \(\?\?\?%\)!"
-        # Pattern for MissingNo. without IV
-        missingno_pattern2 = r"Congratulations <@!?(\d+)>! You caught a Level \?\?\? MissingNo\.(?:<:[^:]+:\d+>)!"
-
-        match = re.search(missingno_pattern1, message_content) or re.search(missingno_pattern2, message_content)
-        if not match:
-            return None
-
-        user_id = match.group(1)
-
-        # Extract gender from MissingNo message if present - check the full message content
-        gender = None
-        if re.search(r'<:male:\d+>', message_content):
-            gender = 'male'
-        elif re.search(r'<:female:\d+>', message_content):
-            gender = 'female'
-        elif re.search(r'<:unknown:\d+>', message_content):
-            gender = 'unknown'
-
-        # Check for shiny MissingNo. - THIS WAS THE MISSING PART!
-        is_shiny = "These colors seem unusual... ✨" in message_content
-
-        # Debug print
-        print(f"DEBUG: MissingNo parsed - Gender: '{gender}', Shiny: {is_shiny}")
-
-        return {
-            'user_id': user_id,
-            'level': '???',
-            'pokemon_name': 'MissingNo.',
-            'iv': '???',
-            'is_shiny': is_shiny,  # Now properly detects shiny
-            'is_gigantamax': False,
-            'gender': gender,
-            'message_type': 'missingno'
-        }
+        guild_settings = await self.settings.get_guild(guild_id)
+        return (
+            guild_settings.get('rare_role_id'),
+            guild_settings.get('regional_role_id'),
+            guild_settings.get('starboard_channel_id')
+        )
 
     def create_catch_embed(self, catch_data, embed_type, message=None):
         """Create embed for catch messages with combined criteria"""
@@ -441,7 +220,10 @@ class Starboard(commands.Cog):
         return embed, view
 
     async def send_to_starboard_channels(self, guild, catch_data, original_message=None):
-        """Send catch data to appropriate starboard channels with combined criteria"""
+        """Send catch data to appropriate starboard channels with combined criteria
+
+        Returns how many posts were queued or sent (0 if nothing new went out).
+        """
         is_shiny = catch_data['is_shiny']
         is_gigantamax = catch_data['is_gigantamax']
         iv = catch_data['iv']
@@ -464,20 +246,11 @@ class Starboard(commands.Cog):
         if message_type == 'missingno':
             embed, view = self.create_catch_embed(catch_data, 'missingno', original_message)
 
-            # Send to server starboard
-            if server_starboard_channel:
-                try:
-                    await server_starboard_channel.send(embed=embed, view=view)
-                except Exception as e:
-                    print(f"Error sending to server starboard: {e}")
-
-            # Send to global starboard
-            if global_starboard_channel:
-                try:
-                    await global_starboard_channel.send(embed=embed, view=view)
-                except Exception as e:
-                    print(f"Error sending to global starboard: {e}")
-            return
+            # Server and global starboards are sent to concurrently
+            return await self.delivery.deliver(
+                (server_starboard_channel, global_starboard_channel), [(embed, view)],
+                source_message_id=original_message.id if original_message else None
+            )
 
         # Handle Eternatus - only shiny and gigantamax criteria, no IV
         if pokemon_name.lower() == "eternatus":
@@ -493,20 +266,12 @@ class Starboard(commands.Cog):
             if embed_type:
                 embed, view = self.create_catch_embed(catch_data, embed_type, original_message)
 
-                # Send to server starboard
-                if server_starboard_channel:
-                    try:
-                        await server_starboard_channel.send(embed=embed, view=view)
-                    except Exception as e:
-                        print(f"Error sending to server starboard: {e}")
-
-                # Send to global starboard
-                if global_starboard_channel:
-                    try:
-                        await global_starboard_channel.send(embed=embed, view=view)
-                    except Exception as e:
-                        print(f"Error sending to global starboard: {e}")
-            return
+                # Server and global starboards are sent to concurrently
+                return await self.delivery.deliver(
+                    (server_starboard_channel, global_starboard_channel), [(embed, view)],
+                    source_message_id=original_message.id if original_message else None
+                )
+            return 0
 
         # Handle regular Pokemon with all combinations
         # Check IV criteria first
@@ -569,19 +334,12 @@ class Starboard(commands.Cog):
         if embed_type:
             embed, view = self.create_catch_embed(catch_data, embed_type, original_message)
 
-            # Send to server starboard
-            if server_starboard_channel:
-                try:
-                    await server_starboard_channel.send(embed=embed, view=view)
-                except Exception as e:
-                    print(f"Error sending to server starboard: {e}")
-
-            # Send to global starboard
-            if global_starboard_channel:
-                try:
-                    await global_starboard_channel.send(embed=embed, view=view)
-                except Exception as e:
-                    print(f"Error sending to global starboard: {e}")
+            # Server and global starboards are sent to concurrently
+            return await self.delivery.deliver(
+                (server_starboard_channel, global_starboard_channel), [(embed, view)],
+                source_message_id=original_message.id if original_message else None
+            )
+        return 0
 
     # Update the manualcheck command to work with new system
     @commands.command(name="manualcheck")
@@ -609,29 +367,17 @@ class Starboard(commands.Cog):
             if input_data.strip().isdigit():
                 message_id = int(input_data.strip())
                 try:
-                    # Try to fetch the message from the current channel first
-                    try:
-                        original_message = await ctx.channel.fetch_message(message_id)
-                    except discord.NotFound:
-                        # If not found in current channel, search in all channels in the guild
-                        found_message = None
-                        for channel in ctx.guild.text_channels:
-                            if channel.permissions_for(ctx.guild.me).read_message_history:
-                                try:
-                                    found_message = await channel.fetch_message(message_id)
-                                    original_message = found_message
-                                    break
-                                except (discord.NotFound, discord.Forbidden):
-                                    continue
-
-                        if not found_message:
-                            await ctx.reply(f"❌ Could not find message with ID `{message_id}` in this server.")
-                            return
+                    # Recently seen messages need no fetch, otherwise try the current channel
+                    # and then search the rest of the server concurrently
+                    original_message = await self.locator.find(ctx.guild, message_id, first_channel=ctx.channel)
+                    if original_message is None:
+                        await ctx.reply(f"❌ Could not find message with ID `{message_id}` in this server.")
+                        return
 
                     catch_message = original_message.content
 
                     # Check if the message is from Poketwo
-                    if original_message.author.id != 716390085896962058:
+                    if original_message.author.id != POKETWO_ID:
                         await ctx.reply(f"❌ The message with ID `{message_id}` is not from Poketwo.")
                         return
 
@@ -653,12 +399,12 @@ class Starboard(commands.Cog):
         message_type = None
 
         # Try MissingNo. first (most specific)
-        catch_data = self.parse_poketwo_missingno_message(catch_message)
+        catch_data = parse_missingno_message(catch_message)
         if catch_data:
             message_type = "MissingNo. catch"
         else:
             # Try catch message
-            catch_data = self.parse_poketwo_catch_message(catch_message)
+            catch_data = parse_catch_message(catch_message)
             if catch_data:
                 message_type = "catch"
 
@@ -730,7 +476,7 @@ class Starboard(commands.Cog):
             return
 
         # Send to starboard using the new combined system
-        await self.send_to_starboard_channels(ctx.guild, catch_data, original_message)
+        sent = await self.send_to_starboard_channels(ctx.guild, catch_data, original_message)
 
         criteria_text = ", ".join(criteria_met)
         # Format IV for success message
@@ -750,6 +496,11 @@ class Starboard(commands.Cog):
         if original_message:
             debug_info = f"\n**Message:** [Jump to original]({original_message.jump_url})"
 
+        if not sent:
+            await ctx.reply(f"ℹ️ This {message_type} was already posted to the starboard, nothing new was sent.\n"
+                           f"**Pokémon:** {pokemon_display} (Level {level}, {iv_display}){debug_info}")
+            return
+
         await ctx.reply(f"✅ {message_type.capitalize()} sent to starboard!\n"
                        f"**Criteria met:** {criteria_text}\n"
                        f"**Pokémon:** {pokemon_display} (Level {level}, {iv_display}){debug_info}")
@@ -865,46 +616,30 @@ class Starboard(commands.Cog):
 
 
     @commands.Cog.listener()
-    async def on_message(self, message):
-        """Listen for Poketwo catch messages"""
-        # Only process messages from Poketwo
-        if message.author.id != 716390085896962058:
-            return
-
-        catch_data = None
-
-        # Check for MissingNo. catch (most specific first)
-        if "MissingNo." in message.content:
-            catch_data = self.parse_poketwo_missingno_message(message.content)
+    async def on_poketwo_missingno(self, event):
+        """MissingNo. catches always go to starboard"""
+        await self.send_to_starboard_channels(event.message.guild, event.data, event.message)
 
-        # Check if it's a catch message
-        elif message.content.startswith("Congratulations"):
-            catch_data = self.parse_poketwo_catch_message(message.content)
-
-        if not catch_data:
-            return
+    @commands.Cog.listener()
+    async def on_poketwo_catch(self, event):
+        """Send catches that meet the starboard criteria"""
+        catch_data = event.data
 
         # Check if this catch is worthy of starboard
         is_shiny = catch_data['is_shiny']
         is_gigantamax = catch_data['is_gigantamax']
         iv = catch_data['iv']
-        message_type = catch_data.get('message_type', 'catch')
 
-        # MissingNo. always goes to starboard
-        if message_type == 'missingno':
-            await self.send_to_starboard_channels(message.guild, catch_data, message)
-        else:
-            # For catches, check criteria
-            # Convert IV string to float for comparison, but keep original string for display
-            iv_value = None
-            if iv != "Hidden" and iv != "???":
-                try:
-                    iv_value = float(iv)
-                except ValueError:
-                    iv_value = None
+        # Convert IV string to float for comparison, but keep original string for display
+        iv_value = None
+        if iv != "Hidden" and iv != "???":
+            try:
+                iv_value = float(iv)
+            except ValueError:
+                iv_value = None
 
-            if is_shiny or is_gigantamax or (iv_value is not None and (iv_value >= 90 or iv_value <= 10)):
-                await self.send_to_starboard_channels(message.guild, catch_data, message)
+        if is_shiny or is_gigantamax or (iv_value is not None and (iv_value >= 90 or iv_value <= 10)):
+            await self.send_to_starboard_channels(event.message.guild, catch_data, event.message)
 
 async def setup(bot):
     await bot.add_cog(Starboard(bot))
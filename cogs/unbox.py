@@ -1,15 +1,25 @@
 import discord
-import re
-import json
-import os
 from datetime import datetime
 from discord.ext import commands
-from config import EMBED_COLOR
+from config import EMBED_COLOR, UNBOX_SUMMARY_THRESHOLD
+from poketwo import POKETWO_ID, parse_unbox_message
+from sprites import get_sprite_catalog
+from settings_cache import get_settings_cache
+from starboard_delivery import get_starboard_delivery, MAX_EMBEDS_PER_MESSAGE
+from message_locator import get_message_locator
+
+# Starboard posts of one box share a single outbox key, whether they go out individually or as
+# the summary, so a re-run of m!bcheck can't post the box again in the other form
+MAX_INDIVIDUAL_EMBEDS = min(UNBOX_SUMMARY_THRESHOLD, MAX_EMBEDS_PER_MESSAGE)
 
 class Unbox(commands.Cog):
-    def __init__(self, bot):
+    def __init__(self, bot, sprites=None, settings=None, delivery=None):
         self.bot = bot
-        self.pokemon_data = self.load_pokemon_data()
+        # Sprite URLs, guild settings and starboard sends are shared with the other cogs
+        self.sprites = sprites or get_sprite_catalog()
+        self.settings = settings or get_settings_cache()
+        self.delivery = delivery or get_starboard_delivery()
+        self.locator = get_message_locator()
 
     @property
     def db(self):
@@ -17,22 +27,6 @@ class Unbox(commands.Cog):
         import __main__
         return getattr(__main__, 'db', None)
 
-    def load_pokemon_data(self):
-        """Load Pokemon data from starboard.txt file"""
-        try:
-            # Try to load from the same directory as the cog
-            starboard_file = os.path.join(os.path.dirname(__file__), '..', 'starboard.txt')
-            if not os.path.exists(starboard_file):
-                # Fallback to current directory
-                starboard_file = 'starboard.txt'
-
-            with open(starboard_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data
-        except Exception as e:
-            print(f"Error loading Pokemon data: {e}")
-            return {}
-
     def get_gender_emoji(self, gender):
         """Get gender emoji based on gender"""
         if gender == 'male':
@@ -46,93 +40,17 @@ class Unbox(commands.Cog):
 
     def find_pokemon_image_url(self, pokemon_name, is_shiny=False, gender=None, is_gigantamax=False):
         """Find Pokemon image URL from the loaded data with gender and Gigantamax support"""
-        # Normalize the pokemon name for matching
-        normalized_name = pokemon_name.strip().lower()
-
-        # If it's Gigantamax, search for Gigantamax variant first
-        if is_gigantamax:
-            # First try to find Gigantamax variant
-            gigantamax_name = f"gigantamax {normalized_name}"
-
-            for key, value in self.pokemon_data.items():
-                if key.startswith('variant_') and 'gigantamax' in key.lower():
-                    pokemon_display_name = value.get('name', '').lower()
-                    if gigantamax_name == pokemon_display_name:
-                        base_url = value.get('image_url', '')
-                        if is_shiny and base_url:
-                            # Replace 'images' with 'shiny' for shiny Gigantamax
-                            return base_url.replace('/images/', '/shiny/')
-                        return base_url
-
-        # Function to search for Pokemon with proper female variant handling
-        def search_pokemon(search_name, prefer_female=False):
-            # First, try to find exact match
-            for key, value in self.pokemon_data.items():
-                pokemon_entry_name = value.get('name', '').lower()
-
-                # Handle the case where female variants have "_female" in the name
-                if prefer_female and gender == 'female':
-                    # First try to find female variant
-                    if pokemon_entry_name == f"{search_name}_female":
-                        return value.get('image_url', '')
-
-                # Try exact match with the search name
-                if pokemon_entry_name == search_name:
-                    return value.get('image_url', '')
-
-            # If no exact match, try partial matching
-            for key, value in self.pokemon_data.items():
-                pokemon_entry_name = value.get('name', '').lower()
-
-                # Handle female variants in partial matching
-                if prefer_female and gender == 'female':
-                    if f"{search_name}_female" in pokemon_entry_name or pokemon_entry_name in f"{search_name}_female":
-                        return value.get('image_url', '')
-
-                # Regular partial matching
-                if search_name in pokemon_entry_name or pokemon_entry_name in search_name:
-                    return value.get('image_url', '')
-
-            return None
-
-        # Search for Pokemon image URL
-        base_url = search_pokemon(normalized_name, prefer_female=True)
-
-        # If female variant not found and we were looking for female, try the base name
-        if base_url is None and gender == 'female':
-            base_url = search_pokemon(normalized_name, prefer_female=False)
-
-        if base_url and is_shiny:
-            # Replace 'images' with 'shiny' for shiny Pokemon
-            return base_url.replace('/images/', '/shiny/')
-
-        return base_url
+        return self.sprites.resolve(pokemon_name, is_shiny, gender, is_gigantamax)
 
     async def get_starboard_channel(self, guild_id):
         """Get the starboard channel for a guild"""
-        if self.db is None:
-            return None
-
-        try:
-            guild_settings = await self.db.guild_settings.find_one({"guild_id": guild_id})
-            if guild_settings:
-                return guild_settings.get('starboard_channel_id')
-        except Exception as e:
-            print(f"Error getting starboard channel: {e}")
-        return None
+        guild_settings = await self.settings.get_guild(guild_id)
+        return guild_settings.get('starboard_channel_id')
 
     async def get_global_starboard_channel(self):
         """Get the global starboard channel"""
-        if self.db is None:
-            return None
-
-        try:
-            global_settings = await self.db.global_settings.find_one({"_id": "starboard"})
-            if global_settings:
-                return global_settings.get('global_starboard_channel_id')
-        except Exception as e:
-            print(f"Error getting global starboard channel: {e}")
-        return None
+        global_settings = await self.settings.get_global()
+        return global_settings.get('global_starboard_channel_id')
 
     async def get_unboxed_by_user(self, message):
         """Get who opened the box from the reply"""
@@ -152,111 +70,6 @@ class Unbox(commands.Cog):
             print(f"Error getting unboxed user: {e}")
             return None
 
-    def extract_pokemon_from_text(self, text):
-        """Extract Pokemon data from any text using flexible patterns"""
-        pokemon_found = []
-
-        # More flexible pattern that handles various formats
-        # This pattern looks for: emoji -> Level X -> Pokemon Name -> gender emoji -> (IV%)
-        patterns = [
-            # Main pattern - handles most cases including Easter Egg format
-            r'<:_:\d+>\s*(?:✨\s*)?Level\s+(\d+)\s+(.+?)\s*<:(male|female|unknown):\d+>\s*\((\d+(?:\.\d+)?)%\)',
-            # Alternative pattern for cases where spacing might differ
-            r'<:_:\d+>\s*(✨\s*)?Level\s+(\d+)\s+(.+?)\s+<:(male|female|unknown):\d+>\s*\((\d+(?:\.\d+)?)%\)',
-        ]
-
-        lines = text.split('\n')
-        for line in lines:
-            line = line.strip()
-
-            # Skip lines that don't contain Pokemon data indicators
-            if not ('<:_:' in line and 'Level' in line and '(' in line and '%' in line):
-                continue
-
-            # Remove any markdown formatting
-            clean_line = line.replace('**', '').replace('- ', '').strip()
-
-            # Check for shiny separately to handle spacing variations
-            is_shiny = '✨' in clean_line
-
-            for pattern in patterns:
-                match = re.search(pattern, clean_line)
-                if match:
-                    # Determine which groups correspond to what based on pattern
-                    if len(match.groups()) == 4:  # Pattern without shiny group
-                        level = match.group(1)
-                        pokemon_name_with_gender = match.group(2).strip()
-                        gender = match.group(3)
-                        iv = float(match.group(4))
-                    else:  # Pattern with shiny group
-                        if match.group(1):  # Shiny marker found in group
-                            is_shiny = True
-                        level = match.group(2)
-                        pokemon_name_with_gender = match.group(3).strip()
-                        gender = match.group(4)
-                        iv = float(match.group(5))
-
-                    # Remove gender emoji from pokemon name if it appears there too
-                    pokemon_name = re.sub(r'<:(male|female|unknown):\d+>', '', pokemon_name_with_gender).strip()
-
-                    # Debug print to help troubleshoot
-                    print(f"DEBUG: Unbox extracted - Pokemon: '{pokemon_name}', Gender: '{gender}', Full captured: '{pokemon_name_with_gender}'")
-
-                    # Check for gigantamax
-                    is_gigantamax = pokemon_name.lower().startswith('gigantamax')
-
-                    pokemon_data = {
-                        'pokemon_name': pokemon_name,
-                        'level': level,
-                        'iv': iv,
-                        'is_shiny': is_shiny,
-                        'is_gigantamax': is_gigantamax,
-                        'gender': gender
-                    }
-
-                    pokemon_found.append(pokemon_data)
-                    break  # Found a match, no need to try other patterns
-
-        return pokemon_found
-
-    def parse_poketwo_unbox_message(self, message, unboxed_by_id=None):
-        """Parse Poketwo box opening message to extract Pokemon information"""
-        if not message.embeds:
-            return []
-
-        embed = message.embeds[0]
-        pokemon_found = []
-
-        # Check if this is a box opening message by looking at title keywords
-        title = embed.title or ""
-
-        # More flexible title checking - includes all bundle types
-        opening_keywords = ['open', 'opening', 'box', 'chest', 'mystery', 'egg', 'eggs', 'bundle', 'puddle', 'rain', 'storm']
-        is_opening_message = any(keyword.lower() in title.lower() for keyword in opening_keywords)
-
-        if not is_opening_message:
-            return []
-
-        # Try to extract Pokemon from description first
-        if embed.description:
-            pokemon_from_desc = self.extract_pokemon_from_text(embed.description)
-            for pokemon_data in pokemon_from_desc:
-                pokemon_data['unboxed_by_id'] = unboxed_by_id
-                pokemon_data['message_type'] = 'unbox'
-                pokemon_found.append(pokemon_data)
-
-        # Try to extract Pokemon from ALL fields regardless of name
-        # This handles any number of bundle fields dynamically
-        for field in embed.fields:
-            if field.value:  # Check if field has any value
-                pokemon_from_field = self.extract_pokemon_from_text(field.value)
-                for pokemon_data in pokemon_from_field:
-                    pokemon_data['unboxed_by_id'] = unboxed_by_id
-                    pokemon_data['message_type'] = 'unbox'
-                    pokemon_found.append(pokemon_data)
-
-        return pokemon_found
-
     def create_unbox_embed(self, pokemon_data, embed_type, message=None):
         """Create embed for unbox"""
         pokemon_name = pokemon_data['pokemon_name']
@@ -308,7 +121,10 @@ class Unbox(commands.Cog):
         if image_url:
             embed.set_thumbnail(url=image_url)
 
-        # Create view with jump to message button
+        return embed, self.create_jump_view(message)
+
+    def create_jump_view(self, message=None):
+        """Create view with jump to message button"""
         view = discord.ui.View()
         if message:
             jump_button = discord.ui.Button(
@@ -318,11 +134,59 @@ class Unbox(commands.Cog):
                 style=discord.ButtonStyle.link
             )
             view.add_item(jump_button)
+        return view
+
+    def get_criteria_text(self, pokemon_data):
+        """Starboard criteria a Pokemon meets, e.g. ✨ Shiny, 📈 High IV (95.16%)"""
+        criteria_met = []
+        if pokemon_data['is_shiny']:
+            criteria_met.append("✨ Shiny")
+        if pokemon_data['is_gigantamax']:
+            criteria_met.append("<:gigantamax:1420708122267226202> Gigantamax")
+        if pokemon_data['iv'] >= 90:
+            criteria_met.append(f"📈 High IV ({pokemon_data['iv']}%)")
+        elif pokemon_data['iv'] <= 10:
+            criteria_met.append(f"📉 Low IV ({pokemon_data['iv']}%)")
+        return ", ".join(criteria_met)
+
+    def create_unbox_summary_embed(self, pokemon_list, message=None):
+        """Create one compact embed listing every qualifying Pokemon from a box opening"""
+        embed = discord.Embed(color=EMBED_COLOR, timestamp=datetime.utcnow())
+        embed.title = f"<:giftbox:1421047453511323658> {len(pokemon_list)} Starboard Unboxes <:giftbox:1421047453511323658>"
+
+        lines = []
+        unboxed_by_id = pokemon_list[0].get('unboxed_by_id')
+        if unboxed_by_id:
+            lines.append(f"**Unboxed By:** <@{unboxed_by_id}>")
+
+        for i, pokemon_data in enumerate(pokemon_list):
+            gender_emoji = self.get_gender_emoji(pokemon_data.get('gender'))
+            pokemon_display = f"{pokemon_data['pokemon_name']} {gender_emoji}" if gender_emoji else pokemon_data['pokemon_name']
+            line = f"**{pokemon_display}** (Level {pokemon_data['level']}) - {self.get_criteria_text(pokemon_data)}"
+
+            # Stay well inside the 4096 character description limit
+            if sum(len(existing) + 1 for existing in lines) + len(line) > 3900:
+                lines.append(f"...and {len(pokemon_list) - i} more")
+                break
+            lines.append(line)
+
+        embed.description = "\n".join(lines)
 
-        return embed, view
+        # Show the rarest pull as the thumbnail
+        highlight = max(pokemon_list, key=lambda p: (p['is_shiny'] and p['is_gigantamax'], p['is_gigantamax'], p['is_shiny']))
+        image_url = self.find_pokemon_image_url(
+            highlight['pokemon_name'], highlight['is_shiny'], highlight.get('gender'), highlight['is_gigantamax']
+        )
+        if image_url:
+            embed.set_thumbnail(url=image_url)
+
+        return embed, self.create_jump_view(message)
 
     async def send_to_starboard_channels(self, guild, pokemon_list, original_message=None):
-        """Send unbox data to appropriate starboard channels"""
+        """Send unbox data to appropriate starboard channels
+
+        Returns how many posts were queued or sent (0 if nothing new went out).
+        """
         # Get server starboard channel
         server_starboard_id = await self.get_starboard_channel(guild.id)
         server_starboard_channel = None
@@ -335,6 +199,10 @@ class Unbox(commands.Cog):
         if global_starboard_id:
             global_starboard_channel = self.bot.get_channel(global_starboard_id)
 
+        # Every qualifying Pokemon's embeds go out together, packed into as few messages as possible
+        embeds_to_send = []
+        qualifying_pokemon = []
+
         # Process each Pokemon that meets criteria
         for pokemon_data in pokemon_list:
             is_shiny = pokemon_data['is_shiny']
@@ -344,8 +212,7 @@ class Unbox(commands.Cog):
             # Check if this Pokemon meets starboard criteria
             if not (is_shiny or is_gigantamax or iv >= 90 or iv <= 10):
                 continue
-
-            embeds_to_send = []
+            qualifying_pokemon.append(pokemon_data)
 
             # Determine what type of unbox this is and create separate embeds for each criteria met
             if is_gigantamax and is_shiny:
@@ -371,21 +238,15 @@ class Unbox(commands.Cog):
                     embed, view = self.create_unbox_embed(pokemon_data, 'iv_low', original_message)
                     embeds_to_send.append((embed, view))
 
-            # Send each embed separately to server starboard
-            if server_starboard_channel and embeds_to_send:
-                for embed, view in embeds_to_send:
-                    try:
-                        await server_starboard_channel.send(embed=embed, view=view)
-                    except Exception as e:
-                        print(f"Error sending to server starboard: {e}")
-
-            # Send each embed separately to global starboard
-            if global_starboard_channel and embeds_to_send:
-                for embed, view in embeds_to_send:
-                    try:
-                        await global_starboard_channel.send(embed=embed, view=view)
-                    except Exception as e:
-                        print(f"Error sending to global starboard: {e}")
+        # Too many for one message - post a single summary instead of several messages per channel
+        if len(embeds_to_send) > MAX_INDIVIDUAL_EMBEDS:
+            embeds_to_send = [self.create_unbox_summary_embed(qualifying_pokemon, original_message)]
+
+        # Server and global starboards are sent to concurrently, the whole box as one outbox row per channel
+        return await self.delivery.deliver(
+            (server_starboard_channel, global_starboard_channel), embeds_to_send,
+            source_message_id=original_message.id if original_message else None
+        )
 
     @commands.command(name="bcheck")
     @commands.has_permissions(administrator=True)
@@ -418,27 +279,15 @@ class Unbox(commands.Cog):
             if input_data.strip().isdigit():
                 message_id = int(input_data.strip())
                 try:
-                    # Try to fetch the message from the current channel first
-                    try:
-                        original_message = await ctx.channel.fetch_message(message_id)
-                    except discord.NotFound:
-                        # If not found in current channel, search in all channels in the guild
-                        found_message = None
-                        for channel in ctx.guild.text_channels:
-                            if channel.permissions_for(ctx.guild.me).read_message_history:
-                                try:
-                                    found_message = await channel.fetch_message(message_id)
-                                    original_message = found_message
-                                    break
-                                except (discord.NotFound, discord.Forbidden):
-                                    continue
-
-                        if not found_message:
-                            await ctx.reply(f"❌ Could not find message with ID `{message_id}` in this server.")
-                            return
+                    # Recently seen messages need no fetch, otherwise try the current channel
+                    # and then search the rest of the server concurrently
+                    original_message = await self.locator.find(ctx.guild, message_id, first_channel=ctx.channel)
+                    if original_message is None:
+                        await ctx.reply(f"❌ Could not find message with ID `{message_id}` in this server.")
+                        return
 
                     # Check if the message is from Poketwo
-                    if original_message.author.id != 716390085896962058:
+                    if original_message.author.id != POKETWO_ID:
                         await ctx.reply(f"❌ The message with ID `{message_id}` is not from Poketwo.")
                         return
 
@@ -459,7 +308,7 @@ class Unbox(commands.Cog):
                 return
 
         # Try to parse as box opening message
-        pokemon_list = self.parse_poketwo_unbox_message(original_message, unboxed_by_id)
+        pokemon_list = parse_unbox_message(original_message, unboxed_by_id)
 
         if not pokemon_list:
             await ctx.reply("❌ Invalid message format. Please make sure it's a proper Poketwo box opening message.")
@@ -490,22 +339,12 @@ class Unbox(commands.Cog):
             return
 
         # Send to starboard
-        await self.send_to_starboard_channels(ctx.guild, qualifying_pokemon, original_message)
+        sent = await self.send_to_starboard_channels(ctx.guild, qualifying_pokemon, original_message)
 
         # Create summary of what was sent
         summary_lines = []
         for pokemon_data in qualifying_pokemon:
-            criteria_met = []
-            if pokemon_data['is_shiny']:
-                criteria_met.append("✨ Shiny")
-            if pokemon_data['is_gigantamax']:
-                criteria_met.append("<:gigantamax:1420708122267226202> Gigantamax")
-            if pokemon_data['iv'] >= 90:
-                criteria_met.append(f"📈 High IV ({pokemon_data['iv']}%)")
-            elif pokemon_data['iv'] <= 10:
-                criteria_met.append(f"📉 Low IV ({pokemon_data['iv']}%)")
-
-            criteria_text = ", ".join(criteria_met)
+            criteria_text = self.get_criteria_text(pokemon_data)
             # Format pokemon name with gender for success message
             gender_emoji = self.get_gender_emoji(pokemon_data.get('gender'))
             pokemon_display = f"{pokemon_data['pokemon_name']} {gender_emoji}" if gender_emoji else pokemon_data['pokemon_name']
@@ -523,6 +362,11 @@ class Unbox(commands.Cog):
             debug_info += f"\n**Message:** [Jump to original]({original_message.jump_url})"
 
         summary_text = "\n".join(summary_lines)
+        if not sent:
+            await ctx.reply(f"ℹ️ This unbox was already posted to the starboard, nothing new was sent.\n"
+                           f"{summary_text}{debug_info}")
+            return
+
         await ctx.reply(f"✅ {len(qualifying_pokemon)} Pokemon sent to starboard!\n"
                        f"{summary_text}{debug_info}")
 
@@ -536,36 +380,11 @@ class Unbox(commands.Cog):
             await ctx.reply("❌ An unexpected error occurred. Please try again.")
 
     @commands.Cog.listener()
-    async def on_message(self, message):
-        """Listen for Poketwo box opening messages"""
-        # Only process messages from Poketwo
-        if message.author.id != 716390085896962058:
-            return
-
-        # Check if it's a box opening message (must have embeds)
-        if not message.embeds:
-            return
-
-        embed = message.embeds[0]
-        title = embed.title or ""
-
-        # More flexible title checking for all bundle types and opening formats
-        opening_keywords = ['open', 'opening', 'box', 'chest', 'mystery', 'egg', 'eggs', 'bundle', 'puddle', 'rain', 'storm']
-        is_opening_message = any(keyword.lower() in title.lower() for keyword in opening_keywords)
-
-        if not is_opening_message:
-            return
-
-        # Get the user who opened the box from the reply
-        unboxed_by_id = await self.get_unboxed_by_user(message)
-        pokemon_list = self.parse_poketwo_unbox_message(message, unboxed_by_id)
-
-        if not pokemon_list:
-            return
-
+    async def on_poketwo_unbox(self, event):
+        """Send unboxed Pokemon that meet the starboard criteria"""
         # Filter Pokemon that meet starboard criteria
         qualifying_pokemon = []
-        for pokemon_data in pokemon_list:
+        for pokemon_data in event.data:
             is_shiny = pokemon_data['is_shiny']
             is_gigantamax = pokemon_data['is_gigantamax']
             iv = pokemon_data['iv']
@@ -574,8 +393,15 @@ class Unbox(commands.Cog):
             if is_shiny or is_gigantamax or iv >= 90 or iv <= 10:
                 qualifying_pokemon.append(pokemon_data)
 
-        if qualifying_pokemon:
-            await self.send_to_starboard_channels(message.guild, qualifying_pokemon, message)
+        if not qualifying_pokemon:
+            return
+
+        # Only look up who opened the box once something is worth posting
+        unboxed_by_id = await self.get_unboxed_by_user(event.message)
+        for pokemon_data in qualifying_pokemon:
+            pokemon_data['unboxed_by_id'] = unboxed_by_id
+
+        await self.send_to_starboard_channels(event.message.guild, qualifying_pokemon, event.message)
 
 async def setup(bot):
     await bot.add_cog(Unbox(bot))
@@ -1,9 +1,54 @@
 # Configuration file for bot-wide constants
+import os
 
 # Embed color used throughout the bot (hex color code)
 # Current: Soft golden/cream color (#f4e5ba)
 EMBED_COLOR = 0xf4e5ba
 
+# Inference executor - image preprocessing and ONNX inference run here instead of on the event loop
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))             # Worker threads/processes
+INFERENCE_USE_PROCESSES = os.getenv("INFERENCE_USE_PROCESSES", "0") == "1"  # Use a process pool instead of threads
+INFERENCE_MAX_PENDING = 32       # Max requests queued or running before callers have to wait
+INFERENCE_QUEUE_TIMEOUT = 2.0    # Seconds to wait for a free slot before rejecting a request
+INFERENCE_TIMEOUT = 10.0         # Seconds a single request may take once it has a slot
+
+# Micro-batching - concurrent spawn predictions are grouped into one ONNX call
+BATCH_WINDOW_MS = int(os.getenv("BATCH_WINDOW_MS", "10"))   # How long the first image waits for company
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "16"))     # Flush early once this many images are queued
+
+# Persistent prediction cache - set PREDICTION_CACHE_DB to a file path to keep predictions across restarts
+PREDICTION_CACHE_DB = os.getenv("PREDICTION_CACHE_DB")
+PREDICTION_CACHE_DB_TTL = 7 * 24 * 3600   # Seconds before a stored prediction is dropped
+
+# Ping subscriptions - guilds whose collections/hunts/AFK flags are kept in memory
+SUBSCRIPTION_MAX_GUILDS = int(os.getenv("SUBSCRIPTION_MAX_GUILDS", "500"))  # Least recently used guilds past this are dropped
+
+# Sprite catalog - starboard.txt sprite URLs shared by the Starboard, Unbox and Egg cogs
+SPRITE_SNAPSHOT = os.getenv("SPRITE_SNAPSHOT")  # Optional pickle path for the prebuilt indexes
+SPRITE_RELOAD_INTERVAL = 30      # Seconds between checks for an edited starboard.txt
+
+# Settings cache - guild_settings/global_settings documents shared by the cogs
+SETTINGS_CACHE_TTL = 300         # Seconds before a cached document is read again (picks up other processes' edits)
+SETTINGS_CACHE_MAX_GUILDS = int(os.getenv("SETTINGS_CACHE_MAX_GUILDS", "2000"))  # Least recently used guilds past this are dropped
+
+# Starboard delivery - posts go to the server and global starboards concurrently
+STARBOARD_SENDS_PER_CHANNEL = 1  # Sends in flight per channel (1 keeps posts in order within Discord's per-channel bucket)
+
+# Starboard outbox - set STARBOARD_OUTBOX_DB to a file path (e.g. starboard_outbox.db) to queue posts in SQLite
+# with retries and dedupe, otherwise posts are sent inline
+STARBOARD_OUTBOX_DB = os.getenv("STARBOARD_OUTBOX_DB")
+STARBOARD_OUTBOX_BATCH = 50          # Rows sent per worker pass
+STARBOARD_OUTBOX_MAX_ATTEMPTS = 8    # Sends tried before a post is dropped
+STARBOARD_OUTBOX_BACKOFF = 5.0       # Seconds before the first retry, doubled after each failure
+STARBOARD_OUTBOX_MAX_BACKOFF = 900.0 # Longest wait between retries
+
+# Unbox starboard - a box with more starboard embeds than this is posted as one summary embed
+UNBOX_SUMMARY_THRESHOLD = int(os.getenv("UNBOX_SUMMARY_THRESHOLD", "10"))  # 10 is the most embeds one message can hold
+
+# Message locator - m!manualcheck/m!bcheck/m!eggcheck message id lookups
+MESSAGE_LOCATOR_RECENT = 2000        # Recent Poketwo messages kept so checking them needs no fetch
+MESSAGE_LOCATOR_CONCURRENCY = 8      # Channels fetched from at once when searching a server
+
 # You can add other bot-wide configuration here as needed
 # For example:
 # BOT_VERSION = "1.0.0"
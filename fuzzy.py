@@ -0,0 +1,51 @@
+# fuzzy.py - typo-tolerant name suggestions backed by a trigram inverted index
+from collections import defaultdict
+
+def trigrams(text):
+    """Set of 3-character shingles, padded so short names and word edges still count"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class TrigramIndex:
+    """Inverted index from trigram -> keys for ranking near-miss spellings
+
+    Only keys that share at least one trigram with the query are scored, so a
+    lookup never has to compare the query against every name.
+    """
+    def __init__(self, keys):
+        self.keys = []
+        self.key_sizes = []
+        self.postings = defaultdict(list)  # trigram -> key ids
+        for key in keys:
+            key_id = len(self.keys)
+            grams = trigrams(key)
+            self.keys.append(key)
+            self.key_sizes.append(len(grams))
+            for gram in grams:
+                self.postings[gram].append(key_id)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def search(self, query, limit=5, min_score=0.45):
+        """Return up to limit (key, score) pairs ranked by trigram Dice similarity"""
+        grams = trigrams(query)
+        if not grams:
+            return []
+
+        # Count shared trigrams per candidate key
+        shared = defaultdict(int)
+        for gram in grams:
+            for key_id in self.postings.get(gram, ()):
+                shared[key_id] += 1
+
+        query_size = len(grams)
+        scored = []
+        for key_id, count in shared.items():
+            score = 2.0 * count / (query_size + self.key_sizes[key_id])
+            if score >= min_score:
+                scored.append((score, key_id))
+
+        # Highest score first, shorter keys break ties
+        scored.sort(key=lambda item: (-item[0], len(self.keys[item[1]])))
+        return [(self.keys[key_id], score) for score, key_id in scored[:limit]]
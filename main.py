@@ -4,7 +4,11 @@ import asyncio
 import aiohttp
 from discord.ext import commands
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
 from predict import Prediction
+from pokedex import get_pokedex
+from starboard_delivery import get_starboard_delivery
+from utils import normalize_pokemon_name
 
 TOKEN = os.getenv("DISCORD_TOKEN")
 MONGODB_URI = os.getenv("MONGODB_URI")
@@ -44,6 +48,7 @@ async def initialize_predictor():
     global predictor
     try:
         predictor = Prediction()
+        await predictor.warm_cache()
         print("Predictor initialized successfully")
     except Exception as e:
         print(f"Failed to initialize predictor: {e}")
@@ -103,6 +108,7 @@ async def create_database_indexes():
         # Index for shiny hunts
         await db.shiny_hunts.create_index([("user_id", 1), ("guild_id", 1)])
         await db.shiny_hunts.create_index("pokemon")
+        await db.shiny_hunts.create_index([("guild_id", 1), ("normalized_pokemon", 1)])
 
         # Index for AFK users
         await db.collection_afk_users.create_index([("user_id", 1), ("guild_id", 1)])
@@ -118,6 +124,28 @@ async def create_database_indexes():
     except Exception as e:
         print(f"Warning: Could not create indexes: {e}")
 
+    await backfill_shiny_hunt_keys()
+
+async def backfill_shiny_hunt_keys():
+    """Add normalized_pokemon to shiny hunts saved before it existed"""
+    try:
+        updates = []
+        cursor = db.shiny_hunts.find(
+            {"normalized_pokemon": {"$exists": False}, "pokemon": {"$exists": True}},
+            {"pokemon": 1}
+        )
+        async for hunt in cursor:
+            updates.append(UpdateOne(
+                {"_id": hunt["_id"]},
+                {"$set": {"normalized_pokemon": normalize_pokemon_name(hunt["pokemon"]).lower()}}
+            ))
+
+        if updates:
+            await db.shiny_hunts.bulk_write(updates, ordered=False)
+            print(f"✅ Backfilled normalized_pokemon on {len(updates)} shiny hunts")
+    except Exception as e:
+        print(f"Warning: Could not backfill shiny hunt keys: {e}")
+
 async def initialize_http_session():
     """Initialize aiohttp session for async HTTP requests"""
     global http_session
@@ -166,6 +194,10 @@ async def on_ready():
 
     await asyncio.gather(*initialization_tasks, return_exceptions=True)
 
+    # Parse pokemondata.json once up front so spawn handlers only do index lookups
+    pokedex = get_pokedex()
+    print(f"✅ Pokedex loaded with {len(pokedex)} entries")
+
     # CRITICAL: Make predictor and http_session accessible to cogs
     bot.predictor = predictor
     bot.http_session = http_session
@@ -177,6 +209,7 @@ async def on_ready():
         print("✅ Jishaku loaded")
         
         # Load custom cogs
+        await bot.load_extension('cogs.router')
         await bot.load_extension('cogs.general')
         await bot.load_extension('cogs.help')
         await bot.load_extension('cogs.collection')
@@ -188,6 +221,9 @@ async def on_ready():
     except Exception as e:
         print(f"❌ Error loading cogs: {e}")
 
+    # Starboard posts queued before a restart are sent from here on
+    get_starboard_delivery().start(bot)
+
     # Start keep-alive task for Railway
     asyncio.create_task(keep_alive())
 
@@ -209,6 +245,11 @@ async def cleanup():
     """Clean up resources on shutdown"""
     global http_session, db_client
 
+    if predictor:
+        predictor.close()
+
+    await get_starboard_delivery().close()
+
     if http_session:
         await http_session.close()
 
@@ -0,0 +1,86 @@
+# message_locator.py - find a message by id anywhere in a guild with as few fetches as possible
+import asyncio
+from collections import OrderedDict
+import discord
+from config import MESSAGE_LOCATOR_RECENT, MESSAGE_LOCATOR_CONCURRENCY
+
+class MessageLocator:
+    """Looks up messages for m!manualcheck, m!bcheck and m!eggcheck
+
+    Recent Poketwo messages are remembered as they arrive, so checking one of
+    them needs no API call at all. Anything else is fetched from the
+    suggested channel first and then searched for across the guild's
+    channels concurrently, stopping at the first hit.
+    """
+    def __init__(self, max_recent=MESSAGE_LOCATOR_RECENT, concurrency=MESSAGE_LOCATOR_CONCURRENCY):
+        self.max_recent = max_recent
+        self.concurrency = concurrency
+        self._recent = OrderedDict()   # message id -> message, least recently seen first
+
+    def remember(self, message):
+        """Record a message seen on the gateway"""
+        self._recent[message.id] = message
+        self._recent.move_to_end(message.id)
+        while len(self._recent) > self.max_recent:
+            self._recent.popitem(last=False)
+
+    def forget(self, message_id):
+        self._recent.pop(message_id, None)
+
+    async def find(self, guild, message_id, first_channel=None):
+        """Find a message in guild, or None if no readable channel has it
+
+        first_channel is tried on its own before the wider search. Permission
+        errors from it are raised, like a plain fetch_message would.
+        """
+        message = self._recent.get(message_id)
+        if message is not None and message.guild is not None and message.guild.id == guild.id:
+            return message
+
+        if first_channel is not None:
+            try:
+                return await first_channel.fetch_message(message_id)
+            except discord.NotFound:
+                pass
+
+        channels = [
+            channel for channel in guild.text_channels
+            if channel != first_channel and channel.permissions_for(guild.me).read_message_history
+        ]
+        return await self._search(channels, message_id)
+
+    async def _search(self, channels, message_id):
+        """Fetch from up to concurrency channels at a time and cancel the rest on the first hit"""
+        if not channels:
+            return None
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(channel):
+            async with semaphore:
+                try:
+                    return await channel.fetch_message(message_id)
+                except discord.HTTPException:
+                    # NotFound, Forbidden or a transient failure - this channel doesn't count
+                    return None
+
+        tasks = [asyncio.ensure_future(fetch(channel)) for channel in channels]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                message = await next_done
+                if message is not None:
+                    self.remember(message)
+                    return message
+            return None
+        finally:
+            for task in tasks:
+                task.cancel()
+
+_locator = None
+
+def get_message_locator():
+    """Get the message locator shared by the router and the check commands"""
+    global _locator
+    if _locator is None:
+        _locator = MessageLocator()
+    return _locator
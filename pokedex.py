@@ -0,0 +1,198 @@
+# pokedex.py - pokemondata.json loaded once with prebuilt lookup indexes
+import os
+import json
+from utils import normalize_pokemon_name
+from fuzzy import TrigramIndex
+
+POKEMON_DATA_FILE = 'pokemondata.json'
+
+def _iter_other_names(pokemon):
+    """Yield every alias in other_names (values may be strings or lists of strings)"""
+    other_names = pokemon.get('other_names')
+    if not other_names or not isinstance(other_names, dict):
+        return
+
+    for lang_name_data in other_names.values():
+        if isinstance(lang_name_data, str):
+            yield lang_name_data
+        elif isinstance(lang_name_data, list):
+            for lang_name in lang_name_data:
+                if lang_name and isinstance(lang_name, str):
+                    yield lang_name
+
+class SpawnTarget:
+    """A spawn resolved once: its dex entry, base form and the normalized keys collectors/hunters match on"""
+    __slots__ = ('name', 'pokemon', 'base_form', 'match_keys')
+
+    def __init__(self, name, pokemon, base_form, match_keys):
+        self.name = name              # canonical name (or the raw name if it isn't in the dex)
+        self.pokemon = pokemon        # dex entry or None
+        self.base_form = base_form    # base form name for variants, else None
+        self.match_keys = match_keys  # frozenset of normalized lowercase names
+
+    def __repr__(self):
+        return f"SpawnTarget({self.name!r}, base_form={self.base_form!r})"
+
+class Pokedex:
+    """In-memory Pokedex with dict indexes so name lookups don't scan every entry"""
+    def __init__(self, entries):
+        self.entries = entries
+        self.by_name = {}             # lowercase name or alias -> entry
+        self.by_normalized_name = {}  # normalized lowercase name or alias -> entry
+        self.by_dex_number = {}       # dex number -> entries sharing it
+        self.variants = {}            # lowercase base name -> base name plus its variant names
+        self.by_rarity = {}           # lowercase rarity -> names
+        self._fuzzy_index = None      # built on first suggest()
+        self._spawn_targets = {}      # spawn name -> SpawnTarget
+        self._build_indexes()
+
+    def _build_indexes(self):
+        # Entries are indexed in file order with setdefault, so the first entry
+        # matching a name wins - the same result the old linear scans returned
+        for pokemon in self.entries:
+            name = pokemon.get('name', '')
+            name_lower = name.lower()
+
+            self.by_name.setdefault(name_lower, pokemon)
+            self.by_normalized_name.setdefault(normalize_pokemon_name(name).lower(), pokemon)
+            for alias in _iter_other_names(pokemon):
+                self.by_name.setdefault(alias.lower(), pokemon)
+                # Accent and gender-suffix stripping is done once here instead of per lookup
+                self.by_normalized_name.setdefault(normalize_pokemon_name(alias).lower(), pokemon)
+
+            dex_number = pokemon.get('dex_number')
+            if dex_number is not None:
+                self.by_dex_number.setdefault(dex_number, []).append(pokemon)
+
+            if name:
+                self.variants.setdefault(name_lower, []).append(name)
+            # An entry listed as a variant of itself already counts as the base form
+            base_form = pokemon.get('variant_of')
+            if pokemon.get('is_variant') and base_form and base_form.lower() != name_lower:
+                self.variants.setdefault(base_form.lower(), []).append(name)
+
+            rarity = pokemon.get('rarity')
+            if rarity:
+                self.by_rarity.setdefault(rarity.lower(), []).append(name)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def find_by_name(self, name):
+        """Find Pokemon by main name or any other language name (case-insensitive)"""
+        if not name:
+            return None
+        return self.by_name.get(name.lower().strip())
+
+    def resolve_spawn(self, name):
+        """Resolve a spawn name to a SpawnTarget once so per-user matching is just key lookups
+
+        Already resolved targets are returned unchanged, so callers can pass either.
+        """
+        if isinstance(name, SpawnTarget):
+            return name
+
+        target = self._spawn_targets.get(name)
+        if target is not None:
+            return target
+
+        pokemon = self.find_by_name(name)
+        canonical_name = pokemon.get('name', name) if pokemon else name
+        match_keys = {normalize_pokemon_name(name).lower()}
+
+        # Collectors and hunters of the base form also want its variants
+        base_form = None
+        if pokemon and pokemon.get('is_variant') and pokemon.get('variant_of'):
+            base_form = pokemon['variant_of']
+            match_keys.add(normalize_pokemon_name(base_form).lower())
+
+        target = SpawnTarget(canonical_name, pokemon, base_form, frozenset(match_keys))
+        # Spawn names come from the model's labels so this stays small, but don't let odd input grow it forever
+        if len(self._spawn_targets) >= 4096:
+            self._spawn_targets.clear()
+        self._spawn_targets[name] = target
+        return target
+
+    def find_by_name_flexible(self, name):
+        """Find Pokemon by name or alias ignoring accents and -Male/-Female suffixes"""
+        if not name:
+            return None
+        return self.by_normalized_name.get(normalize_pokemon_name(name).lower())
+
+    def resolve_names(self, names):
+        """Resolve a batch of user inputs in one pass
+
+        Returns (matches, misses) - the matched entries and the inputs that
+        didn't match anything, both in input order. Blank inputs are skipped.
+        """
+        matches = []
+        misses = []
+        for name in names:
+            if not name or not isinstance(name, str):
+                continue
+
+            name = name.strip()
+            if not name:
+                continue
+
+            pokemon = self.by_normalized_name.get(normalize_pokemon_name(name).lower())
+            if pokemon and pokemon.get('name'):
+                matches.append(pokemon)
+            else:
+                misses.append(name)
+        return matches, misses
+
+    def suggest(self, name, limit=3):
+        """Suggest main Pokemon names close to a misspelled input, best match first"""
+        if not name:
+            return []
+
+        if self._fuzzy_index is None:
+            # Index every normalized name and alias so typos in either are caught
+            self._fuzzy_index = TrigramIndex(self.by_normalized_name.keys())
+
+        suggestions = []
+        for key, _score in self._fuzzy_index.search(normalize_pokemon_name(name).lower(), limit=limit * 3):
+            # Several aliases can point at the same Pokemon, only list it once
+            pokemon_name = self.by_normalized_name[key].get('name')
+            if pokemon_name and pokemon_name not in suggestions:
+                suggestions.append(pokemon_name)
+                if len(suggestions) >= limit:
+                    break
+        return suggestions
+
+    def find_by_dex_number(self, dex_number):
+        """Get all entries (base form and variants) for a dex number"""
+        return self.by_dex_number.get(dex_number, [])
+
+    def get_variants(self, base_pokemon_name):
+        """Get all variants of a Pokemon (including the base form)"""
+        return list(self.variants.get(base_pokemon_name.lower(), []))
+
+    def get_names_by_rarity(self, rarity):
+        """Get all Pokemon names with the given rarity (e.g. 'legendary')"""
+        return list(self.by_rarity.get(rarity.lower(), []))
+
+    @classmethod
+    def load(cls, path=POKEMON_DATA_FILE):
+        """Parse pokemondata.json into a Pokedex"""
+        if not os.path.exists(path):
+            # Fall back to the copy next to this module
+            path = os.path.join(os.path.dirname(os.path.realpath(__file__)), POKEMON_DATA_FILE)
+
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+_pokedex = None
+
+def get_pokedex():
+    """Get the shared Pokedex, loading it on first use"""
+    global _pokedex
+    if _pokedex is None:
+        try:
+            _pokedex = Pokedex.load()
+        except Exception as e:
+            print(f"Failed to load pokemondata.json: {e}")
+            # Don't cache the failure so the next call retries
+            return Pokedex([])
+    return _pokedex
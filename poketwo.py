@@ -0,0 +1,227 @@
+# poketwo.py - classifying and parsing Poketwo messages
+import re
+
+POKETWO_ID = 716390085896962058
+
+# Embed titles Poketwo uses for spawns
+SPAWN_TITLE = "A wild pokémon has appeared!"
+SPAWN_TITLE_AFTER_FLEE = "A new wild pokémon has appeared!"
+
+# Title keywords for box/bundle openings - covers all bundle types
+OPENING_KEYWORDS = ['open', 'opening', 'box', 'chest', 'mystery', 'egg', 'eggs', 'bundle', 'puddle', 'rain', 'storm']
+
+class PoketwoEvent:
+    """A Poketwo message classified and parsed once, published to the cogs that handle it"""
+    __slots__ = ('kind', 'message', 'data')
+
+    def __init__(self, kind, message, data=None):
+        self.kind = kind        # 'spawn', 'catch', 'missingno', 'unbox' or 'hatch'
+        self.message = message  # the original discord.Message
+        self.data = data        # parsed dict (list of dicts for unbox, None for spawn)
+
+    def __repr__(self):
+        return f"PoketwoEvent({self.kind!r}, message_id={self.message.id})"
+
+def is_spawn_title(title):
+    """Check for a spawn embed title (including the one sent after the last spawn fled)"""
+    return title == SPAWN_TITLE or (title.endswith(SPAWN_TITLE_AFTER_FLEE) and "fled." in title)
+
+def is_unbox_title(title):
+    """Check for a box/bundle opening embed title"""
+    title = title.lower()
+    return any(keyword in title for keyword in OPENING_KEYWORDS)
+
+def is_hatch_content(content):
+    """Check for an egg hatch message"""
+    return "has hatched into" in content and "Egg" in content
+
+def classify_message(message):
+    """Classify and parse a Poketwo message once, or return None if nothing handles it"""
+    content = message.content
+
+    if message.embeds:
+        title = message.embeds[0].title or ""
+        if title and is_spawn_title(title):
+            return PoketwoEvent('spawn', message)
+
+    # MissingNo. is the most specific catch message, so check it first
+    if "MissingNo." in content:
+        data = parse_missingno_message(content)
+        return PoketwoEvent('missingno', message, data) if data else None
+
+    if content.startswith("Congratulations"):
+        data = parse_catch_message(content)
+        return PoketwoEvent('catch', message, data) if data else None
+
+    if is_hatch_content(content):
+        data = parse_hatch_message(content)
+        return PoketwoEvent('hatch', message, data) if data else None
+
+    if message.embeds and is_unbox_title(message.embeds[0].title or ""):
+        data = parse_unbox_message(message)
+        return PoketwoEvent('unbox', message, data) if data else None
+
+    return None
+
+# ===== PARSERS =====
+# Compiled once at import. Each message type has one combined pattern that
+# captures name, level, IV and gender (and shiny/gigantamax markers where
+# they sit inside the matched text) in a single pass.
+
+CATCH_RE = re.compile(
+    r"Congratulations <@!?(?P<user_id>\d+)>! You caught a Level (?P<level>\d+) "
+    r"(?P<name>.+?)(?:<:(?P<gender>male|female|unknown):\d+>)?(?:\s+\((?P<iv>\d+\.?\d*)%\))?!"
+)
+
+# MissingNo. shows either a gender emoji, a ??? IV or both
+MISSINGNO_RE = re.compile(
+    r"Congratulations <@!?(?P<user_id>\d+)>! You caught a Level \?\?\? MissingNo\."
+    r"(?P<emoji><:(?P<emoji_name>[^:]+):\d+>)?(?P<iv> \(\?\?\?%\))?!"
+)
+
+# Format: Your <egg> **(Gigantamax )?Pokemon Egg** has hatched into a **<:_:id> (✨ )?Level X (<gmax emoji> Gigantamax )?Pokemon<gender> (IV%)?**
+# The bold markers are optional, and the closing ones are only required when the opening ones are there
+HATCH_RE = re.compile(
+    r"Your <:egg_[^>]+> (?P<bold>\*\*)?(?P<egg>.+?) Egg(?(bold)\*\*) has hatched into a (?(bold)\*\*)"
+    r"<:_:\d+> (?P<shiny>✨ )?Level (?P<level>\d+) (?P<gmax><:_:1242455099213877248> Gigantamax )?"
+    r"(?P<name>.+?)(?:<:(?P<gender>male|female|unknown):\d+>)?\s*(?:\((?P<iv>\d+\.?\d*)%\))?"
+    r"(?(bold)\*\*|\s*$)",
+    re.MULTILINE
+)
+
+# One unboxed Pokemon: emoji -> (✨) Level X -> Pokemon Name -> gender emoji -> (IV%)
+# [^\S\n] is whitespace that stays on the Pokemon's own line
+UNBOX_RE = re.compile(
+    r"<:_:\d+>[^\S\n]*(?P<shiny>✨[^\S\n]*)?Level[^\S\n]+(?P<level>\d+)[^\S\n]+(?P<name>.+?)[^\S\n]*"
+    r"<:(?P<gender>male|female|unknown):\d+>[^\S\n]*\((?P<iv>\d+(?:\.\d+)?)%\)"
+)
+
+SHINY_CHAIN_RE = re.compile(r"Shiny streak reset\. \(\*\*(\d+)\*\*\)")
+
+SHINY_TEXT = "These colors seem unusual... ✨"
+GIGANTAMAX_TEXT = "Woah! It seems that this pokémon has the Gigantamax Factor..."
+
+def parse_catch_message(message_content):
+    """Parse Poketwo catch message to extract relevant information"""
+    match = CATCH_RE.search(message_content)
+    if not match:
+        return None
+
+    # Shiny, gigantamax and chain notes all come after the catch line
+    tail = message_content[match.end():]
+
+    shiny_chain = None
+    if "Shiny streak" in tail:
+        chain_match = SHINY_CHAIN_RE.search(tail)
+        if chain_match:
+            shiny_chain = chain_match.group(1)
+
+    return {
+        'user_id': match.group('user_id'),
+        'level': match.group('level'),
+        'pokemon_name': match.group('name').strip(),
+        # Keep the original string format to preserve trailing zeros - no IV means it's hidden
+        'iv': match.group('iv') or "Hidden",
+        'is_shiny': SHINY_TEXT in tail,
+        'is_gigantamax': GIGANTAMAX_TEXT in tail,
+        'shiny_chain': shiny_chain,
+        'gender': match.group('gender'),
+        'message_type': 'catch'
+    }
+
+def parse_missingno_message(message_content):
+    """Parse Poketwo MissingNo. catch message"""
+    match = MISSINGNO_RE.search(message_content)
+    if not match or not (match.group('emoji') or match.group('iv')):
+        return None
+
+    gender = match.group('emoji_name')
+    if gender not in ('male', 'female', 'unknown'):
+        gender = None
+
+    return {
+        'user_id': match.group('user_id'),
+        'level': '???',
+        'pokemon_name': 'MissingNo.',
+        'iv': '???',
+        'is_shiny': SHINY_TEXT in message_content,
+        'is_gigantamax': False,
+        'gender': gender,
+        'message_type': 'missingno'
+    }
+
+def parse_hatch_message(message_content, hatched_by_id=None):
+    """Parse Poketwo egg hatch message to extract relevant information"""
+    match = HATCH_RE.search(message_content)
+    if not match:
+        return None
+
+    is_gigantamax = match.group('gmax') is not None
+    egg_pokemon = match.group('egg').strip()
+    if is_gigantamax and egg_pokemon.startswith("Gigantamax "):
+        egg_pokemon = egg_pokemon[len("Gigantamax "):]
+
+    iv_str = match.group('iv')
+
+    return {
+        'egg_pokemon': egg_pokemon,
+        'level': match.group('level'),
+        'pokemon_name': match.group('name').strip(),
+        'iv': float(iv_str) if iv_str else "Hidden",
+        'is_shiny': match.group('shiny') is not None,  # ✨ indicates shiny
+        'is_gigantamax': is_gigantamax,
+        'gender': match.group('gender'),
+        'message_type': 'hatch',
+        'hatched_by_id': hatched_by_id
+    }
+
+def extract_pokemon_from_text(text):
+    """Extract every unboxed Pokemon from an embed description or field value"""
+    pokemon_found = []
+
+    # Markdown never sits inside the parts the pattern captures
+    text = text.replace('**', '').replace('- ', '')
+
+    for match in UNBOX_RE.finditer(text):
+        # Shiny marker can be anywhere on the Pokemon's line
+        is_shiny = match.group('shiny') is not None
+        if not is_shiny:
+            line_start = text.rfind('\n', 0, match.start()) + 1
+            line_end = text.find('\n', match.end())
+            is_shiny = '✨' in text[line_start:line_end if line_end != -1 else len(text)]
+
+        pokemon_name = match.group('name').strip()
+
+        pokemon_found.append({
+            'pokemon_name': pokemon_name,
+            'level': match.group('level'),
+            'iv': float(match.group('iv')),
+            'is_shiny': is_shiny,
+            'is_gigantamax': pokemon_name.lower().startswith('gigantamax'),
+            'gender': match.group('gender')
+        })
+
+    return pokemon_found
+
+def parse_unbox_message(message, unboxed_by_id=None):
+    """Parse Poketwo box opening message to extract Pokemon information"""
+    if not message.embeds:
+        return []
+
+    embed = message.embeds[0]
+    if not is_unbox_title(embed.title or ""):
+        return []
+
+    # The description first, then every field - this handles any number of bundle fields
+    texts = [embed.description] + [field.value for field in embed.fields]
+
+    pokemon_found = []
+    for text in texts:
+        if not text:
+            continue
+        for pokemon_data in extract_pokemon_from_text(text):
+            pokemon_data['unboxed_by_id'] = unboxed_by_id
+            pokemon_data['message_type'] = 'unbox'
+            pokemon_found.append(pokemon_data)
+
+    return pokemon_found
@@ -6,82 +6,355 @@ import io
 import os
 import json
 import time
+import sys
 import hashlib
+import asyncio
+import multiprocessing
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from typing import Optional, Tuple
+from config import (
+    INFERENCE_WORKERS,
+    INFERENCE_USE_PROCESSES,
+    INFERENCE_MAX_PENDING,
+    INFERENCE_QUEUE_TIMEOUT,
+    INFERENCE_TIMEOUT,
+    BATCH_WINDOW_MS,
+    BATCH_MAX_SIZE,
+    PREDICTION_CACHE_DB,
+    PREDICTION_CACHE_DB_TTL
+)
+from prediction_store import PersistentPredictionStore
 
 SUBMODULE_PATH = os.path.dirname(os.path.realpath(__file__))  
 ONNX_PATH = os.path.join(SUBMODULE_PATH, "model/pokemon_cnn_v2.onnx")
 LABELS_PATH = os.path.join(SUBMODULE_PATH, "model/labels_v2.json")
 
+# ImageNet normalization constants
+MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+# Side length of the thumbnail used for pixel hashing
+PIXEL_HASH_SIZE = 32
+
+# Number of top logits kept with each persisted prediction
+TOP_K = 5
+
+def create_session(onnx_path):
+    """Create an ONNX session with performance optimizations"""
+    sess_opts = ort.SessionOptions()
+    sess_opts.intra_op_num_threads = min(4, os.cpu_count())  # Limit threads for Railway
+    sess_opts.inter_op_num_threads = 1
+    sess_opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    sess_opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+    # Use only CPU provider for Railway free tier
+    providers = ["CPUExecutionProvider"]
+
+    return ort.InferenceSession(
+        onnx_path, 
+        sess_options=sess_opts, 
+        providers=providers
+    )
+
+def decode_image(image_data: bytes) -> Image.Image:
+    """Decode raw image bytes into an RGB image"""
+    try:
+        return Image.open(io.BytesIO(image_data)).convert("RGB")
+    except Exception as e:
+        raise ValueError(f"Failed to process image: {e}")
+
+def pixel_hash(image: Image.Image) -> str:
+    """Hash of the downsampled pixels - identical artwork matches regardless of file encoding"""
+    thumbnail = image.resize((PIXEL_HASH_SIZE, PIXEL_HASH_SIZE), Image.NEAREST)
+    return hashlib.blake2b(thumbnail.tobytes(), digest_size=16).hexdigest()
+
+def decode_and_hash(image_data: bytes) -> Tuple[str, Image.Image]:
+    """Decode image bytes and compute their pixel hash (CPU bound)"""
+    image = decode_image(image_data)
+    return pixel_hash(image), image
+
+def image_to_tensor(image: Image.Image) -> np.ndarray:
+    """Resize and normalize an RGB image into an NCHW tensor (CPU bound)"""
+    # Resize with high quality resampling
+    image = image.resize((224, 224), Image.LANCZOS)
+
+    # Convert to numpy array and normalize
+    image = np.array(image, dtype=np.float32) / 255.0
+    image = (image - MEAN) / STD
+
+    # Convert to CHW format and add batch dimension
+    image = np.transpose(image, (2, 0, 1))  # CHW
+    return np.expand_dims(image, axis=0).astype(np.float32)  # NCHW
+
+def preprocess_image_bytes(image_data: bytes) -> np.ndarray:
+    """Decode, resize and normalize raw image bytes into an NCHW tensor (CPU bound)"""
+    return image_to_tensor(decode_image(image_data))
+
+def run_session(session, image: np.ndarray) -> np.ndarray:
+    """Run the model on a preprocessed batch and return the raw logits"""
+    inputs = {session.get_inputs()[0].name: image}
+    return session.run(None, inputs)[0]
+
+# Session owned by each worker when inference runs in a process pool
+_worker_session = None
+
+def _init_worker(onnx_path):
+    """Process pool initializer - every worker process loads its own session"""
+    global _worker_session
+    _worker_session = create_session(onnx_path)
+
+def _worker_run_batch(batch: np.ndarray) -> np.ndarray:
+    """Run a batch through the model inside a worker process"""
+    return run_session(_worker_session, batch)
+
+class InferenceBusyError(RuntimeError):
+    """Raised when the inference queue stays full for longer than the queue timeout"""
+
+class InferenceExecutor:
+    """Bounded executor that keeps preprocessing and inference off the event loop"""
+    def __init__(self, workers=INFERENCE_WORKERS, use_processes=INFERENCE_USE_PROCESSES,
+                 max_pending=INFERENCE_MAX_PENDING, queue_timeout=INFERENCE_QUEUE_TIMEOUT,
+                 timeout=INFERENCE_TIMEOUT, initializer=None, initargs=()):
+        self.workers = workers
+        self.use_processes = use_processes
+        self.queue_timeout = queue_timeout
+        self.timeout = timeout
+
+        if use_processes:
+            # Spawn instead of fork - forking a process that already runs ONNX threads can deadlock
+            self.pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=initializer,
+                initargs=initargs
+            )
+        else:
+            self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+
+        # Each slot is one queued or running request; callers wait here when the pool is saturated
+        self._slots = asyncio.Semaphore(max_pending)
+        self.pending = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    async def run(self, func, *args):
+        """Run func(*args) in the pool with backpressure and a per-request timeout"""
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise InferenceBusyError("Prediction queue is full, please try again later")
+
+        self.pending += 1
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.pool, func, *args)
+        # Release the slot only when the work really finishes, even if the caller gave up
+        future.add_done_callback(self._release_slot)
+
+        try:
+            # Shield so a timed out caller doesn't cancel the future the slot is tied to
+            return await asyncio.wait_for(asyncio.shield(future), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise TimeoutError(f"Prediction timed out after {self.timeout:g}s")
+
+    def _release_slot(self, _future):
+        self.pending -= 1
+        self._slots.release()
+
+    def shutdown(self):
+        """Stop accepting work and let running tasks finish in the background"""
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+class MicroBatcher:
+    """Groups concurrent predictions into a single batched inference call"""
+    def __init__(self, run_batch, window_ms=BATCH_WINDOW_MS, max_batch=BATCH_MAX_SIZE):
+        self.run_batch = run_batch  # async callable: NCHW batch -> logits (N, num_classes)
+        self.window = window_ms / 1000
+        self.max_batch = max(1, max_batch)
+        self._pending = []  # (tensor, future) pairs waiting for the next flush
+        self._flush_handle = None
+        self._tasks = set()
+        self.batches = 0
+        self.images = 0
+
+    async def submit(self, tensor: np.ndarray) -> np.ndarray:
+        """Queue a single-image tensor and wait for its row of logits"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((tensor, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            # First image of a new batch opens the collection window
+            self._flush_handle = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """Hand everything collected so far to a batch run"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        """Run one batch and fan the results back out to the waiting callers"""
+        try:
+            logits = await self.run_batch(np.concatenate([tensor for tensor, _ in batch], axis=0))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.images += len(batch)
+
+        for row, (_, future) in zip(logits, batch):
+            # Callers that timed out or were cancelled already have a finished future
+            if not future.done():
+                future.set_result(row)
+
 class PredictionCache:
-    """Simple in-memory cache for predictions"""
-    def __init__(self, max_size=1000, ttl_seconds=3600):  # 1 hour TTL
-        self.cache = {}
-        self.timestamps = {}
+    """In-memory LRU cache for predictions with TTL expiry and O(1) get/set"""
+    def __init__(self, max_size=1000, ttl_seconds=3600, max_bytes=2 * 1024 * 1024):  # 1 hour TTL
+        # key -> (value, expires_at, size_in_bytes), least recently used first
+        self.cache = OrderedDict()
+        # (expires_at, key) in insertion order - the TTL is fixed, so this is also expiry order
+        self._expiry_queue = deque()
         self.max_size = max_size
         self.ttl_seconds = ttl_seconds
-
-    def _cleanup_expired(self):
-        """Remove expired entries"""
-        current_time = time.time()
-        expired_keys = [
-            key for key, timestamp in self.timestamps.items()
-            if current_time - timestamp > self.ttl_seconds
-        ]
-        for key in expired_keys:
-            self.cache.pop(key, None)
-            self.timestamps.pop(key, None)
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _entry_size(key, value) -> int:
+        """Approximate memory used by a cache entry"""
+        size = sys.getsizeof(key) + sys.getsizeof(value)
+        if isinstance(value, tuple):
+            size += sum(sys.getsizeof(item) for item in value)
+        return size
+
+    def _remove(self, key):
+        """Drop an entry and its byte count"""
+        _, _, size = self.cache.pop(key)
+        self.total_bytes -= size
+
+    def _sweep_expired(self, now):
+        """Drop expired entries from the front of the expiry queue"""
+        while self._expiry_queue and self._expiry_queue[0][0] <= now:
+            expires_at, key = self._expiry_queue.popleft()
+            entry = self.cache.get(key)
+            # Skip queue items left behind by entries that were overwritten or evicted
+            if entry is not None and entry[1] == expires_at:
+                self._remove(key)
+                self.expirations += 1
+
+        # Compact when overwritten or evicted keys have left too many stale queue items
+        if len(self._expiry_queue) > 2 * len(self.cache) + 64:
+            self._expiry_queue = deque(
+                (expires_at, key) for expires_at, key in self._expiry_queue
+                if key in self.cache and self.cache[key][1] == expires_at
+            )
 
     def get(self, key: str) -> Optional[Tuple[str, str]]:
         """Get cached prediction if valid"""
-        self._cleanup_expired()
-        if key in self.cache:
-            current_time = time.time()
-            if current_time - self.timestamps[key] <= self.ttl_seconds:
-                return self.cache[key]
-            else:
-                # Remove expired entry
-                self.cache.pop(key, None)
-                self.timestamps.pop(key, None)
-        return None
+        entry = self.cache.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry[1] <= time.monotonic():
+            # Remove expired entry
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self.cache.move_to_end(key)
+        self.hits += 1
+        return entry[0]
 
     def set(self, key: str, value: Tuple[str, str]):
         """Cache a prediction"""
-        self._cleanup_expired()
-
-        # Remove oldest entries if cache is full
-        if len(self.cache) >= self.max_size:
-            oldest_key = min(self.timestamps.keys(), key=lambda k: self.timestamps[k])
-            self.cache.pop(oldest_key, None)
-            self.timestamps.pop(oldest_key, None)
+        now = time.monotonic()
+        self._sweep_expired(now)
 
-        self.cache[key] = value
-        self.timestamps[key] = time.time()
+        if key in self.cache:
+            self._remove(key)
+
+        expires_at = now + self.ttl_seconds
+        size = self._entry_size(key, value)
+        self.cache[key] = (value, expires_at, size)
+        self.total_bytes += size
+        self._expiry_queue.append((expires_at, key))
+
+        # Evict least recently used entries while over either limit
+        while len(self.cache) > self.max_size or (self.max_bytes and self.total_bytes > self.max_bytes):
+            oldest_key = next(iter(self.cache))
+            if oldest_key == key:
+                break
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        """Cache counters for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.cache),
+            'bytes': self.total_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
 
 class Prediction:
-    def __init__(self, onnx_path=ONNX_PATH, labels_path=LABELS_PATH):
+    def __init__(self, onnx_path=ONNX_PATH, labels_path=LABELS_PATH, executor=None,
+                 cache_db_path=PREDICTION_CACHE_DB):
         self.onnx_path = onnx_path
         self.labels_path = labels_path
         self.class_names = self.load_class_names()
         self.cache = PredictionCache()
+        # Keyed on downloaded bytes and decoded pixels, so the same artwork under a new URL still hits
+        self.content_cache = PredictionCache(max_size=2000)
+
+        # Optional on-disk copy of both caches, warmed into memory by warm_cache()
+        self.store = None
+        if cache_db_path:
+            self.store = PersistentPredictionStore(
+                cache_db_path, self._model_signature(), ttl_seconds=PREDICTION_CACHE_DB_TTL
+            )
 
-        # Enhanced ONNX session setup with performance optimizations
-        sess_opts = ort.SessionOptions()
-        sess_opts.intra_op_num_threads = min(4, os.cpu_count())  # Limit threads for Railway
-        sess_opts.inter_op_num_threads = 1
-        sess_opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
-        sess_opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
-
-        # Use only CPU provider for Railway free tier
-        providers = ["CPUExecutionProvider"]
+        if executor is None:
+            if INFERENCE_USE_PROCESSES:
+                executor = InferenceExecutor(initializer=_init_worker, initargs=(self.onnx_path,))
+            else:
+                executor = InferenceExecutor()
+        self.executor = executor
 
-        self.ort_session = ort.InferenceSession(
-            self.onnx_path, 
-            sess_options=sess_opts, 
-            providers=providers
-        )
+        # With a process pool every worker owns its session, so the main process only
+        # builds one on demand for predict_sync
+        self.ort_session = None if self.executor.use_processes else create_session(self.onnx_path)
+        self.batcher = MicroBatcher(self._run_batch)
 
-        print(f"ONNX session initialized with providers: {self.ort_session.get_providers()}")
+        mode = "process" if self.executor.use_processes else "thread"
+        print(f"ONNX inference running in a {mode} pool with {self.executor.workers} workers")
 
     def load_class_names(self):
         """Load class names from labels_v2.json"""
@@ -101,12 +374,43 @@ class Prediction:
                 return [name.strip('"') for name in data]  # Remove quotes if present
             raise ValueError("labels_v2.json must be a list or dict")
 
+    def _model_signature(self) -> str:
+        """Identify the model so persisted predictions from an older model are discarded
+
+        Built from the labels and the model file's contents (not its mtime), so a
+        redeploy or fresh checkout of the same model keeps the stored predictions.
+        Called once at startup.
+        """
+        signature = hashlib.md5("\n".join(self.class_names).encode())
+        if os.path.exists(self.onnx_path):
+            with open(self.onnx_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    signature.update(chunk)
+        return signature.hexdigest()
+
+    async def warm_cache(self):
+        """Fill the in-memory caches from the persistent store"""
+        if self.store is None:
+            return
+
+        try:
+            rows = await self.store.load(limit=self.cache.max_size + self.content_cache.max_size)
+        except Exception as e:
+            print(f"Failed to load persistent prediction cache: {e}")
+            return
+
+        for key, label, confidence in rows:
+            # URL keys are bare md5 digests, content keys carry a "bytes:"/"pixels:" prefix
+            target = self.content_cache if ":" in key else self.cache
+            target.set(key, (label, confidence))
+        print(f"Prediction cache warmed with {len(rows)} stored predictions")
+
     def _generate_cache_key(self, url: str) -> str:
         """Generate cache key from URL"""
         return hashlib.md5(url.encode()).hexdigest()
 
-    async def preprocess_image_from_url(self, url: str, session: aiohttp.ClientSession):
-        """Async image preprocessing with optimized settings"""
+    async def fetch_image_bytes(self, url: str, session: aiohttp.ClientSession) -> bytes:
+        """Download raw image bytes"""
         try:
             # Use the shared HTTP session from main module
             timeout = aiohttp.ClientTimeout(total=5, connect=2)
@@ -114,39 +418,65 @@ class Prediction:
                 if response.status != 200:
                     raise ValueError(f"HTTP {response.status} error fetching image")
 
-                image_data = await response.read()
+                return await response.read()
 
         except Exception as e:
             raise ValueError(f"Failed to load image from URL: {e}")
 
-        try:
-            # Process image
-            image = Image.open(io.BytesIO(image_data)).convert("RGB")
-        except Exception as e:
-            raise ValueError(f"Failed to process image: {e}")
-
-        # Resize with high quality resampling
-        image = image.resize((224, 224), Image.LANCZOS)
-
-        # Convert to numpy array and normalize
-        image = np.array(image, dtype=np.float32) / 255.0
-
-        # ImageNet normalization
-        mean = np.array([0.485, 0.456, 0.406], dtype=np.float32)
-        std = np.array([0.229, 0.224, 0.225], dtype=np.float32)
-        image = (image - mean) / std
-
-        # Convert to CHW format and add batch dimension
-        image = np.transpose(image, (2, 0, 1))  # CHW
-        image = np.expand_dims(image, axis=0).astype(np.float32)  # NCHW
+    async def preprocess_image_from_url(self, url: str, session: aiohttp.ClientSession):
+        """Async image preprocessing with optimized settings"""
+        image_data = await self.fetch_image_bytes(url, session)
+        return await self.executor.run(preprocess_image_bytes, image_data)
+
+    async def _run_batch(self, batch: np.ndarray) -> np.ndarray:
+        """Run a stacked batch through the model in the executor"""
+        if self.executor.use_processes:
+            return await self.executor.run(_worker_run_batch, batch)
+        return await self.executor.run(run_session, self.ort_session, batch)
+
+    def _generate_content_key(self, image_data: bytes) -> str:
+        """Generate cache key from the downloaded image bytes"""
+        return "bytes:" + hashlib.blake2b(image_data, digest_size=16).hexdigest()
+
+    async def _infer(self, image: Image.Image) -> np.ndarray:
+        """Preprocess in the executor, then batch inference with other in-flight spawns"""
+        tensor = await self.executor.run(image_to_tensor, image)
+        return await self.batcher.submit(tensor)
+
+    def _format_result(self, logits: np.ndarray) -> Tuple[str, str]:
+        """Turn raw logits into a (name, confidence) pair"""
+        pred_idx = int(np.argmax(logits))
+        probabilities = self.softmax(logits)
+        prob = float(probabilities[pred_idx])
 
-        return image
+        name = self.class_names[pred_idx] if pred_idx < len(self.class_names) else f"unknown_{pred_idx}"
+        confidence = f"{prob * 100:.2f}%"
+        return name, confidence
+
+    def _top_k(self, logits: np.ndarray, k=TOP_K) -> list:
+        """Top-k (label, logit) pairs for persistence"""
+        top = np.argsort(logits)[::-1][:k]
+        return [
+            [self.class_names[i] if i < len(self.class_names) else f"unknown_{i}", round(float(logits[i]), 4)]
+            for i in top
+        ]
 
     def softmax(self, x):
         """Vectorized softmax computation"""
         exp_x = np.exp(x - np.max(x))
         return exp_x / np.sum(exp_x)
 
+    def _remember(self, result, url_keys=(), content_keys=(), top_k=None):
+        """Cache a result in memory and queue it for the persistent store"""
+        for key in url_keys:
+            self.cache.set(key, result)
+        for key in content_keys:
+            self.content_cache.set(key, result)
+
+        if self.store:
+            for key in (*url_keys, *content_keys):
+                self.store.put(key, result, top_k)
+
     async def predict(self, url: str, session: aiohttp.ClientSession = None) -> Tuple[str, str]:
         """Async prediction with caching"""
         # Check cache first
@@ -162,26 +492,28 @@ class Prediction:
             if session is None:
                 raise ValueError("HTTP session not available")
 
-        # Preprocess image
-        image = await self.preprocess_image_from_url(url, session)
-
-        # Run inference
-        inputs = {self.ort_session.get_inputs()[0].name: image}
-        outputs = self.ort_session.run(None, inputs)
-        logits = outputs[0][0]
-
-        # Get prediction
-        pred_idx = int(np.argmax(logits))
-        probabilities = self.softmax(logits)
-        prob = float(probabilities[pred_idx])
+        # Download on the loop; identical bytes under a different URL skip all image work
+        image_data = await self.fetch_image_bytes(url, session)
+        content_key = self._generate_content_key(image_data)
+        cached_result = self.content_cache.get(content_key)
+        if cached_result:
+            self._remember(cached_result, url_keys=[cache_key])
+            return cached_result
 
-        name = self.class_names[pred_idx] if pred_idx < len(self.class_names) else f"unknown_{pred_idx}"
-        confidence = f"{prob * 100:.2f}%"
+        # Same pixels in a different encoding skip the resize and inference
+        pixel_key, image = await self.executor.run(decode_and_hash, image_data)
+        pixel_key = "pixels:" + pixel_key
+        cached_result = self.content_cache.get(pixel_key)
+        if cached_result:
+            self._remember(cached_result, url_keys=[cache_key], content_keys=[content_key])
+            return cached_result
 
-        # Cache result
-        result = (name, confidence)
-        self.cache.set(cache_key, result)
+        logits = await self._infer(image)
+        result = self._format_result(logits)
+        top_k = self._top_k(logits)
 
+        # Cache result under every key
+        self._remember(result, url_keys=[cache_key], content_keys=[content_key, pixel_key], top_k=top_k)
         return result
 
     def predict_sync(self, url: str) -> Tuple[str, str]:
@@ -196,43 +528,27 @@ class Prediction:
 
         try:
             response = requests.get(url, timeout=5)
-            image = Image.open(io.BytesIO(response.content)).convert("RGB")
+            image_data = response.content
         except Exception as e:
             raise ValueError(f"Failed to load image from URL: {e}")
 
-        # Resize with high quality resampling
-        image = image.resize((224, 224), Image.LANCZOS)
-
-        # Convert to numpy array and normalize
-        image = np.array(image, dtype=np.float32) / 255.0
-
-        # ImageNet normalization
-        mean = np.array([0.485, 0.456, 0.406], dtype=np.float32)
-        std = np.array([0.229, 0.224, 0.225], dtype=np.float32)
-        image = (image - mean) / std
-
-        # Convert to CHW format and add batch dimension
-        image = np.transpose(image, (2, 0, 1))
-        image = np.expand_dims(image, axis=0).astype(np.float32)
+        if self.ort_session is None:
+            self.ort_session = create_session(self.onnx_path)
 
-        # Run inference
-        inputs = {self.ort_session.get_inputs()[0].name: image}
-        outputs = self.ort_session.run(None, inputs)
-        logits = outputs[0][0]
-
-        pred_idx = int(np.argmax(logits))
-        probabilities = self.softmax(logits)
-        prob = float(probabilities[pred_idx])
-
-        name = self.class_names[pred_idx] if pred_idx < len(self.class_names) else f"unknown_{pred_idx}"
-        confidence = f"{prob * 100:.2f}%"
+        logits = run_session(self.ort_session, preprocess_image_bytes(image_data))[0]
 
         # Cache result
-        result = (name, confidence)
+        result = self._format_result(logits)
         self.cache.set(cache_key, result)
 
         return result
 
+    def close(self):
+        """Shut down the inference executor and flush the persistent cache"""
+        self.executor.shutdown()
+        if self.store:
+            self.store.close()
+
 def main():
     """Test function for development"""
     import asyncio
@@ -0,0 +1,131 @@
+# prediction_store.py - SQLite persistence for the prediction caches
+import os
+import json
+import time
+import sqlite3
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+class PersistentPredictionStore:
+    """SQLite-backed prediction store so the caches survive restarts
+
+    All SQLite work happens on one dedicated thread. put() only buffers rows
+    on the event loop and a delayed flush writes them in a single transaction.
+    """
+    def __init__(self, path, model_signature, ttl_seconds=7 * 24 * 3600, flush_delay=1.0):
+        self.path = path
+        self.model_signature = model_signature
+        self.ttl_seconds = ttl_seconds
+        self.flush_delay = flush_delay
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prediction-store")
+        self._conn = None
+        self._buffer = []
+        self._flush_handle = None
+        self._flush_tasks = set()
+        self.rows_written = 0
+
+    def _open(self):
+        """Open the database and drop rows that are stale or from another model (writer thread)"""
+        if self._conn is not None:
+            return
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS predictions (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                label TEXT NOT NULL,
+                confidence TEXT NOT NULL,
+                top_k TEXT,
+                model TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_predictions_created ON predictions (created_at)")
+        # Predictions from a different model or past the TTL are not worth keeping
+        self._conn.execute(
+            "DELETE FROM predictions WHERE model != ? OR created_at < ?",
+            (self.model_signature, time.time() - self.ttl_seconds)
+        )
+        self._conn.commit()
+
+    def _read_recent(self, limit) -> List[Tuple[str, str, str]]:
+        """Read the newest rows, oldest first (writer thread)"""
+        self._open()
+        rows = self._conn.execute(
+            "SELECT key, label, confidence FROM predictions WHERE model = ? ORDER BY created_at DESC LIMIT ?",
+            (self.model_signature, limit)
+        ).fetchall()
+        rows.reverse()
+        return rows
+
+    def _write_rows(self, rows):
+        """Upsert a batch of rows in one transaction (writer thread)"""
+        self._open()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO predictions (key, kind, label, confidence, top_k, model, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        self.rows_written += len(rows)
+
+    async def load(self, limit=5000) -> List[Tuple[str, str, str]]:
+        """Return up to limit recent (key, label, confidence) rows for cache warming"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._writer, self._read_recent, limit)
+
+    def put(self, key: str, result: Tuple[str, str], top_k: Optional[list] = None):
+        """Queue a prediction for writing - never blocks the event loop"""
+        kind = key.split(":", 1)[0] if ":" in key else "url"
+        label, confidence = result
+        self._buffer.append((
+            key, kind, label, confidence,
+            json.dumps(top_k) if top_k else None,
+            self.model_signature, time.time()
+        ))
+
+        if self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._flush_handle = loop.call_later(self.flush_delay, self._flush)
+
+    def _flush(self):
+        """Hand the buffered rows to the writer thread"""
+        self._flush_handle = None
+        rows, self._buffer = self._buffer, []
+        if not rows:
+            return
+
+        loop = asyncio.get_running_loop()
+        task = asyncio.ensure_future(loop.run_in_executor(self._writer, self._write_rows, rows))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task):
+        self._flush_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            print(f"Error writing prediction cache: {task.exception()}")
+
+    def close(self):
+        """Write anything still buffered and close the database"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        rows, self._buffer = self._buffer, []
+        try:
+            if rows:
+                self._writer.submit(self._write_rows, rows).result()
+            if self._conn is not None:
+                self._writer.submit(self._conn.close).result()
+        except Exception as e:
+            print(f"Error closing prediction cache: {e}")
+        finally:
+            self._writer.shutdown(wait=True)
@@ -0,0 +1,145 @@
+# settings_cache.py - guild and global settings documents cached in memory with write-through updates
+import time
+import asyncio
+from collections import OrderedDict
+from config import SETTINGS_CACHE_TTL, SETTINGS_CACHE_MAX_GUILDS
+
+GLOBAL_SETTINGS_ID = "starboard"
+
+def _main_db():
+    """Database from the main module, like the cogs' db properties"""
+    import __main__
+    return getattr(__main__, 'db', None)
+
+class SettingsCache:
+    """Shared cache of guild_settings documents plus the one global_settings document
+
+    Reads are served from memory for ttl seconds (so edits made by another
+    process still show up), writes go to MongoDB first and then update the
+    cached copy. Missing documents are cached as {} so guilds without any
+    settings don't query on every event.
+    """
+    def __init__(self, get_db=_main_db, ttl=SETTINGS_CACHE_TTL, max_guilds=SETTINGS_CACHE_MAX_GUILDS):
+        self._get_db = get_db
+        self.ttl = ttl
+        self.max_guilds = max_guilds
+        self._guilds = OrderedDict()   # guild_id -> (loaded_at, settings dict), least recently used first
+        self._global = None            # (loaded_at, settings dict)
+        self._pending = {}             # guild_id or None (global) -> in-flight load task
+
+    @property
+    def db(self):
+        return self._get_db()
+
+    def _fresh(self, entry):
+        return entry is not None and time.monotonic() - entry[0] < self.ttl
+
+    async def _load_once(self, key, loader):
+        """Run loader for key, sharing the result with concurrent callers"""
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.ensure_future(loader())
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(task)
+
+    # ===== GUILD SETTINGS =====
+    async def get_guild(self, guild_id):
+        """Settings document for a guild ({} if it has none or the database is unavailable)"""
+        entry = self._guilds.get(guild_id)
+        if self._fresh(entry):
+            self._guilds.move_to_end(guild_id)
+            return entry[1]
+
+        if self.db is None:
+            return {}
+        return await self._load_once(guild_id, lambda: self._load_guild(guild_id))
+
+    async def _load_guild(self, guild_id):
+        try:
+            doc = await self.db.guild_settings.find_one({"guild_id": guild_id}, {"_id": 0})
+        except Exception as e:
+            # Don't cache failures so the next event retries
+            print(f"Error loading guild settings: {e}")
+            return {}
+
+        settings = doc or {}
+        self._store_guild(guild_id, settings)
+        return settings
+
+    def _store_guild(self, guild_id, settings):
+        self._guilds[guild_id] = (time.monotonic(), settings)
+        self._guilds.move_to_end(guild_id)
+        while len(self._guilds) > self.max_guilds:
+            self._guilds.popitem(last=False)
+
+    async def set_guild(self, guild_id, **fields):
+        """Write guild settings fields and update the cached copy (raises on database errors)"""
+        await self.db.guild_settings.update_one(
+            {"guild_id": guild_id},
+            {"$set": fields},
+            upsert=True
+        )
+
+        # A read that started before the write could otherwise cache the old document
+        task = self._pending.get(guild_id)
+        if task is not None:
+            await asyncio.wait([task])
+
+        entry = self._guilds.get(guild_id)
+        if entry is not None:
+            # Replace rather than mutate so readers holding the old dict aren't surprised
+            self._store_guild(guild_id, {**entry[1], **fields})
+
+    def invalidate_guild(self, guild_id):
+        """Drop a guild so the next read goes to the database"""
+        self._guilds.pop(guild_id, None)
+
+    # ===== GLOBAL SETTINGS =====
+    async def get_global(self):
+        """The global settings document ({} if there is none or the database is unavailable)"""
+        if self._fresh(self._global):
+            return self._global[1]
+
+        if self.db is None:
+            return {}
+        return await self._load_once(None, self._load_global)
+
+    async def _load_global(self):
+        try:
+            doc = await self.db.global_settings.find_one({"_id": GLOBAL_SETTINGS_ID})
+        except Exception as e:
+            print(f"Error loading global settings: {e}")
+            return {}
+
+        settings = doc or {}
+        self._global = (time.monotonic(), settings)
+        return settings
+
+    async def set_global(self, **fields):
+        """Write global settings fields and update the cached copy (raises on database errors)"""
+        await self.db.global_settings.update_one(
+            {"_id": GLOBAL_SETTINGS_ID},
+            {"$set": fields},
+            upsert=True
+        )
+
+        task = self._pending.get(None)
+        if task is not None:
+            await asyncio.wait([task])
+
+        if self._global is not None:
+            self._global = (time.monotonic(), {**self._global[1], **fields})
+
+    def clear(self):
+        self._guilds.clear()
+        self._global = None
+
+_settings_cache = None
+
+def get_settings_cache():
+    """Get the settings cache shared by every cog"""
+    global _settings_cache
+    if _settings_cache is None:
+        _settings_cache = SettingsCache()
+    return _settings_cache
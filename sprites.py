@@ -0,0 +1,202 @@
+# sprites.py - starboard.txt sprite lookups backed by prebuilt name indexes
+import os
+import json
+import time
+import pickle
+from config import SPRITE_SNAPSHOT, SPRITE_RELOAD_INTERVAL
+
+SPRITE_DATA_FILE = 'starboard.txt'
+SNAPSHOT_VERSION = 1
+FEMALE_KEY_SUFFIX = '_female'
+
+def shiny_url(url):
+    """Swap a regular sprite URL for its shiny counterpart"""
+    return url.replace('/images/', '/shiny/') if url else url
+
+class SpriteResolver:
+    """Resolves (name, gender, gigantamax, shiny) to a thumbnail URL with dict lookups
+
+    starboard.txt is indexed once in file order, and the first entry for a name
+    wins. Entries whose key ends in _female only serve female lookups, so
+    other genders get the regular sprite even when the female entry comes
+    first, and a name with only a female sprite falls back to it.
+    """
+    def __init__(self, data):
+        self.data = data
+        self.by_name = {}         # lowercase name -> regular sprite URL
+        self.female_by_name = {}  # lowercase name -> female sprite URL (keys ending in _female)
+        self.max_by_name = {}     # lowercase "gigantamax x" / "eternamax eternatus" -> sprite URL
+        self._names = []          # distinct lowercase names in file order for partial matches
+        self._partial = {}        # query -> matched lowercase name or None
+        self._build_indexes()
+
+    def _build_indexes(self):
+        female_entries = []
+        for key, value in self.data.items():
+            name = value.get('name', '').lower()
+            url = value.get('image_url', '')
+
+            if name not in self.by_name and name not in self.female_by_name:
+                self._names.append(name)
+
+            key_lower = key.lower()
+            if key_lower.endswith(FEMALE_KEY_SUFFIX):
+                # Female sprites share the base name, only the key tells them apart
+                self.female_by_name.setdefault(name, url)
+                female_entries.append((name, url))
+                continue
+
+            self.by_name.setdefault(name, url)
+            if key.startswith('variant_') and ('gigantamax' in key_lower or 'eternamax' in key_lower):
+                self.max_by_name.setdefault(name, url)
+
+        # A name that only has a female sprite still resolves for other genders
+        for name, url in female_entries:
+            self.by_name.setdefault(name, url)
+
+    def __len__(self):
+        return len(self.data)
+
+    def _partial_match(self, name):
+        """First name in file order that contains the query or is contained in it"""
+        if name in self._partial:
+            return self._partial[name]
+
+        match = None
+        for entry_name in self._names:
+            if name in entry_name or entry_name in name:
+                match = entry_name
+                break
+
+        # Spawn and catch names repeat a lot, but don't let odd input grow this forever
+        if len(self._partial) >= 4096:
+            self._partial.clear()
+        self._partial[name] = match
+        return match
+
+    def _lookup(self, name, gender):
+        if gender == 'female' and name in self.female_by_name:
+            return self.female_by_name[name]
+        return self.by_name.get(name)
+
+    def resolve(self, pokemon_name, is_shiny=False, gender=None, is_gigantamax=False):
+        """Find the sprite URL for a Pokemon, or None if nothing in starboard.txt matches"""
+        name = pokemon_name.strip().lower()
+
+        if is_gigantamax:
+            # Eternatus uses its Eternamax form instead of a Gigantamax one
+            max_name = "eternamax eternatus" if name == "eternatus" else f"gigantamax {name}"
+            url = self.max_by_name.get(max_name)
+            if url is not None:
+                return shiny_url(url) if is_shiny else url
+
+        url = self._lookup(name, gender)
+        if url is None:
+            # Fall back to the old substring matching for names starboard.txt spells differently
+            matched_name = self._partial_match(name)
+            if matched_name is not None:
+                url = self._lookup(matched_name, gender)
+
+        if url and is_shiny:
+            return shiny_url(url)
+        return url
+
+def _sprite_data_path():
+    """starboard.txt in the working directory, else the copy next to this module"""
+    if os.path.exists(SPRITE_DATA_FILE):
+        return SPRITE_DATA_FILE
+    return os.path.join(os.path.dirname(os.path.realpath(__file__)), SPRITE_DATA_FILE)
+
+class SpriteCatalog:
+    """One shared SpriteResolver for every cog, loaded on first use
+
+    The resolver is rebuilt when starboard.txt's mtime changes (checked at most
+    every SPRITE_RELOAD_INTERVAL seconds). With a snapshot path the built
+    indexes are pickled so later startups can skip parsing the JSON.
+    """
+    def __init__(self, path=None, snapshot_path=SPRITE_SNAPSHOT, reload_interval=SPRITE_RELOAD_INTERVAL):
+        self.path = path or _sprite_data_path()
+        self.snapshot_path = snapshot_path
+        self.reload_interval = reload_interval
+        self._resolver = None
+        self._mtime = None        # mtime of starboard.txt the resolver was built from
+        self._last_check = 0.0
+
+    @property
+    def resolver(self):
+        """Current SpriteResolver, loading or reloading it if starboard.txt changed"""
+        now = time.monotonic()
+        if self._resolver is None or now - self._last_check >= self.reload_interval:
+            self._last_check = now
+            self._refresh()
+        return self._resolver
+
+    def _refresh(self):
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError as e:
+            if self._resolver is None:
+                print(f"Error loading sprite data: {e}")
+                self._resolver = SpriteResolver({})
+            return
+
+        if self._resolver is not None and mtime == self._mtime:
+            return
+
+        reloading = self._resolver is not None
+        resolver = self._load_snapshot(mtime)
+        if resolver is None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    resolver = SpriteResolver(json.load(f))
+            except Exception as e:
+                print(f"Error loading sprite data: {e}")
+                if self._resolver is None:
+                    # Serve nothing for now, the next check retries
+                    self._resolver = SpriteResolver({})
+                return
+            self._save_snapshot(resolver, mtime)
+
+        self._resolver = resolver
+        self._mtime = mtime
+        if reloading:
+            print(f"Reloaded {len(resolver)} sprites from {self.path}")
+
+    def _load_snapshot(self, mtime):
+        """Prebuilt resolver from the snapshot if it was taken from this version of starboard.txt"""
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return None
+        try:
+            with open(self.snapshot_path, 'rb') as f:
+                snapshot = pickle.load(f)
+            if snapshot.get('version') == SNAPSHOT_VERSION and snapshot.get('mtime') == mtime:
+                return snapshot['resolver']
+        except Exception as e:
+            print(f"Ignoring unreadable sprite snapshot: {e}")
+        return None
+
+    def _save_snapshot(self, resolver, mtime):
+        if not self.snapshot_path:
+            return
+        try:
+            # Write then rename so a crash never leaves a half-written snapshot
+            tmp_path = f"{self.snapshot_path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump({'version': SNAPSHOT_VERSION, 'mtime': mtime, 'resolver': resolver}, f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.snapshot_path)
+        except Exception as e:
+            print(f"Failed to write sprite snapshot: {e}")
+
+    def resolve(self, pokemon_name, is_shiny=False, gender=None, is_gigantamax=False):
+        """Find the sprite URL for a Pokemon, see SpriteResolver.resolve"""
+        return self.resolver.resolve(pokemon_name, is_shiny, gender, is_gigantamax)
+
+_catalog = None
+
+def get_sprite_catalog():
+    """Get the shared SpriteCatalog (starboard.txt itself is only read on first lookup)"""
+    global _catalog
+    if _catalog is None:
+        _catalog = SpriteCatalog()
+    return _catalog
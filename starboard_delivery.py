@@ -0,0 +1,256 @@
+# starboard_delivery.py - concurrent starboard sends packed into as few messages as possible
+import time
+import asyncio
+import discord
+from config import (
+    STARBOARD_SENDS_PER_CHANNEL,
+    STARBOARD_OUTBOX_DB,
+    STARBOARD_OUTBOX_BATCH,
+    STARBOARD_OUTBOX_MAX_ATTEMPTS,
+    STARBOARD_OUTBOX_BACKOFF,
+    STARBOARD_OUTBOX_MAX_BACKOFF
+)
+from starboard_outbox import StarboardOutbox
+
+MAX_EMBEDS_PER_MESSAGE = 10   # Discord limit per message
+MAX_EMBED_CHARS = 6000        # Discord limit on the combined size of a message's embeds
+OUTBOX_PURGE_INTERVAL = 3600  # Seconds between sweeps of old sent/failed outbox rows
+
+def _view_key(view):
+    """What a post's buttons link to - posts can only share a message if their buttons match"""
+    if view is None:
+        return ()
+    return tuple((getattr(item, 'url', None), getattr(item, 'label', None)) for item in view.children)
+
+def _pack(groups):
+    """Pack (embeds, view, tag) groups into (embeds, view, tags) messages
+
+    A group's embeds always stay in one message. Groups share a message while
+    they have the same buttons (e.g. the same Jump to Message link) and the
+    message stays within Discord's embed limits.
+    """
+    messages = []
+    current_key = None
+    current_chars = 0
+    for embeds, view, tag in groups:
+        key = _view_key(view)
+        group_chars = sum(len(embed) for embed in embeds)
+        if (messages and key == current_key
+                and len(messages[-1][0]) + len(embeds) <= MAX_EMBEDS_PER_MESSAGE
+                and current_chars + group_chars <= MAX_EMBED_CHARS):
+            messages[-1][0].extend(embeds)
+            messages[-1][2].append(tag)
+            current_chars += group_chars
+        else:
+            messages.append((list(embeds), view, [tag]))
+            current_key = key
+            current_chars = group_chars
+    return messages
+
+def pack_posts(posts):
+    """Group consecutive (embed, view) posts into (embeds, view) messages"""
+    return [(embeds, view) for embeds, view, _ in _pack([([embed], view, None) for embed, view in posts])]
+
+def _post_payload(posts):
+    """JSON-safe copy of one Pokemon's posts for the outbox (link buttons are all a view holds here)"""
+    buttons = []
+    view = posts[0][1]
+    if view is not None:
+        for item in view.children:
+            if getattr(item, 'url', None):
+                buttons.append({'label': item.label, 'url': item.url, 'emoji': str(item.emoji) if item.emoji else None})
+    return {'embeds': [embed.to_dict() for embed, _ in posts], 'buttons': buttons}
+
+def _view_from_payload(payload):
+    view = discord.ui.View()
+    for button in payload.get('buttons', []):
+        view.add_item(discord.ui.Button(
+            label=button.get('label'),
+            url=button['url'],
+            emoji=button.get('emoji'),
+            style=discord.ButtonStyle.link
+        ))
+    return view
+
+class StarboardDelivery:
+    """Sends starboard posts to several channels at once
+
+    Every channel gets its own send bucket so a busy channel (the global
+    starboard) never has more than STARBOARD_SENDS_PER_CHANNEL requests in
+    flight, which also keeps its posts in order. Different channels are sent
+    to concurrently.
+
+    With an outbox, posts tied to a source message are queued instead and a
+    background worker sends them, retrying failures with exponential backoff.
+    """
+    def __init__(self, sends_per_channel=STARBOARD_SENDS_PER_CHANNEL, outbox=None):
+        self.sends_per_channel = sends_per_channel
+        self.outbox = outbox
+        self._buckets = {}   # channel id -> Semaphore
+        self._get_channel = None
+        self._worker = None
+        self._wakeup = None
+
+    def _bucket(self, channel_id):
+        bucket = self._buckets.get(channel_id)
+        if bucket is None:
+            bucket = asyncio.Semaphore(self.sends_per_channel)
+            self._buckets[channel_id] = bucket
+        return bucket
+
+    async def send(self, channel, posts):
+        """Send posts to one channel, returns how many messages went out"""
+        sent = 0
+        async with self._bucket(channel.id):
+            for embeds, view in pack_posts(posts):
+                try:
+                    await channel.send(embeds=embeds, view=view)
+                    sent += 1
+                except Exception as e:
+                    print(f"Error sending to starboard channel {channel.id}: {e}")
+        return sent
+
+    async def deliver(self, channels, posts, source_message_id=None, pokemon_indexes=None):
+        """Send the same posts to every channel concurrently (None channels are skipped)
+
+        When the outbox is running and the posts come from a known message, they
+        are queued under (source_message_id, pokemon index, channel) instead, so
+        a post that was already queued or sent is dropped. pokemon_indexes gives
+        each post's Pokemon position in the source message (default 0 for all).
+
+        Returns how many outbox rows were queued, or how many messages were sent
+        inline - 0 means nothing new went out.
+        """
+        if not posts:
+            return 0
+        targets = [channel for channel in channels if channel is not None]
+        if not targets:
+            return 0
+
+        if self.outbox is not None and self._worker is not None and source_message_id is not None:
+            return await self._enqueue(targets, posts, source_message_id, pokemon_indexes)
+
+        return sum(await asyncio.gather(*(self.send(channel, posts) for channel in targets)))
+
+    # ===== OUTBOX =====
+    async def _enqueue(self, channels, posts, source_message_id, pokemon_indexes):
+        # One outbox row per Pokemon and channel, holding every embed for that Pokemon
+        by_pokemon = {}
+        for i, post in enumerate(posts):
+            pokemon_index = pokemon_indexes[i] if pokemon_indexes else 0
+            by_pokemon.setdefault(pokemon_index, []).append(post)
+
+        items = []
+        for channel in channels:
+            for pokemon_index, pokemon_posts in by_pokemon.items():
+                items.append((pokemon_index, channel.id, _post_payload(pokemon_posts)))
+
+        try:
+            queued = await self.outbox.enqueue(source_message_id, items)
+        except Exception as e:
+            # Don't lose the post because the queue is unavailable
+            print(f"Error queueing starboard posts, sending directly: {e}")
+            return sum(await asyncio.gather(*(self.send(channel, posts) for channel in channels)))
+
+        if queued:
+            self._wakeup.set()
+        return queued
+
+    def start(self, bot):
+        """Start draining the outbox (safe to call again on reconnect)"""
+        if self.outbox is None or self._worker is not None:
+            return
+        self._get_channel = bot.get_channel
+        self._wakeup = asyncio.Event()
+        self._worker = asyncio.create_task(self._run_outbox())
+
+    async def _run_outbox(self):
+        last_purge = 0.0
+        while True:
+            try:
+                if time.time() - last_purge >= OUTBOX_PURGE_INTERVAL:
+                    last_purge = time.time()
+                    await self.outbox.purge()
+
+                rows = await self.outbox.due(STARBOARD_OUTBOX_BATCH)
+                if rows:
+                    await self._drain(rows)
+                    continue
+
+                # Sleep until the next retry is due or something new is queued
+                self._wakeup.clear()
+                next_due = await self.outbox.next_due()
+                timeout = OUTBOX_PURGE_INTERVAL if next_due is None else max(0.0, next_due - time.time())
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=min(timeout, OUTBOX_PURGE_INTERVAL))
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Starboard outbox worker error: {e}")
+                await asyncio.sleep(5)
+
+    async def _drain(self, rows):
+        """Send a batch of due rows, every channel concurrently"""
+        by_channel = {}
+        for row in rows:
+            by_channel.setdefault(row['channel_id'], []).append(row)
+        await asyncio.gather(*(self._send_rows(channel_id, channel_rows) for channel_id, channel_rows in by_channel.items()))
+
+    async def _send_rows(self, channel_id, rows):
+        channel = self._get_channel(channel_id)
+        if channel is None:
+            await self.outbox.mark_failed([row['key'] for row in rows], "channel not found")
+            return
+
+        groups = [
+            ([discord.Embed.from_dict(embed) for embed in row['payload']['embeds']], _view_from_payload(row['payload']), row)
+            for row in rows
+        ]
+
+        async with self._bucket(channel_id):
+            for embeds, view, message_rows in _pack(groups):
+                keys = [row['key'] for row in message_rows]
+                try:
+                    await channel.send(embeds=embeds, view=view)
+                except (discord.Forbidden, discord.NotFound) as e:
+                    # Retrying won't help without permissions or a channel
+                    print(f"Dropping starboard post for channel {channel_id}: {e}")
+                    await self.outbox.mark_failed(keys, str(e)[:200])
+                    continue
+                except Exception as e:
+                    attempts = max(row['attempts'] for row in message_rows) + 1
+                    if attempts >= STARBOARD_OUTBOX_MAX_ATTEMPTS:
+                        print(f"Giving up on starboard post for channel {channel_id} after {attempts} attempts: {e}")
+                        await self.outbox.mark_failed(keys, str(e)[:200])
+                    else:
+                        delay = min(STARBOARD_OUTBOX_BACKOFF * 2 ** (attempts - 1), STARBOARD_OUTBOX_MAX_BACKOFF)
+                        print(f"Error sending to starboard channel {channel_id}, retrying in {delay:.0f}s: {e}")
+                        await self.outbox.mark_retry(keys, time.time() + delay, str(e)[:200])
+                    continue
+
+                await self.outbox.mark_sent(keys)
+
+    async def close(self):
+        """Stop the worker, anything still queued is sent after the next start"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._worker = None
+        if self.outbox is not None:
+            self.outbox.close()
+            self.outbox = None
+
+_delivery = None
+
+def get_starboard_delivery():
+    """Get the delivery pipeline shared by the starboard cogs"""
+    global _delivery
+    if _delivery is None:
+        outbox = StarboardOutbox(STARBOARD_OUTBOX_DB) if STARBOARD_OUTBOX_DB else None
+        _delivery = StarboardDelivery(outbox=outbox)
+    return _delivery
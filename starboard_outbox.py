@@ -0,0 +1,163 @@
+# starboard_outbox.py - SQLite queue of starboard posts so sends survive failures and never repeat
+import os
+import json
+import time
+import sqlite3
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+# Row states
+PENDING = 'pending'
+SENT = 'sent'
+FAILED = 'failed'
+
+class StarboardOutbox:
+    """Durable starboard queue keyed on (source message id, pokemon index, channel id)
+
+    Enqueueing a key that is already pending or sent is a no-op, and keys are
+    remembered for retention_seconds after they are sent, so a re-run of
+    m!manualcheck or m!bcheck can't post a Pokemon to the same channel again.
+    A failed key is queued afresh, so a re-run after fixing the channel or its
+    permissions still posts. All SQLite work happens on one dedicated thread.
+    """
+    def __init__(self, path, retention_seconds=7 * 24 * 3600):
+        self.path = path
+        self.retention_seconds = retention_seconds
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="starboard-outbox")
+        self._conn = None
+
+    def _open(self):
+        """Open the database and forget rows past the retention window (writer thread)"""
+        if self._conn is not None:
+            return
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS outbox (
+                source_message_id INTEGER NOT NULL,
+                pokemon_index INTEGER NOT NULL,
+                channel_id INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                last_error TEXT,
+                PRIMARY KEY (source_message_id, pokemon_index, channel_id)
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at)")
+        self._purge_rows(time.time())
+
+    def _purge_rows(self, now):
+        self._open()
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM outbox WHERE status != ? AND created_at < ?",
+                (PENDING, now - self.retention_seconds)
+            )
+
+    def _insert_rows(self, rows):
+        """Queue new rows and requeue failed ones, returns how many were queued (writer thread)"""
+        self._open()
+        with self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT INTO outbox "
+                "(source_message_id, pokemon_index, channel_id, payload, status, next_attempt_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(source_message_id, pokemon_index, channel_id) DO UPDATE SET "
+                "status = 'pending', attempts = 0, next_attempt_at = excluded.next_attempt_at, "
+                "payload = excluded.payload, created_at = excluded.created_at, last_error = NULL "
+                "WHERE outbox.status = 'failed'",
+                rows
+            )
+            return self._conn.total_changes - before
+
+    def _read_due(self, now, limit):
+        """Pending rows whose next attempt is due, oldest first (writer thread)"""
+        self._open()
+        rows = self._conn.execute(
+            "SELECT source_message_id, pokemon_index, channel_id, payload, attempts FROM outbox "
+            "WHERE status = ? AND next_attempt_at <= ? ORDER BY created_at, pokemon_index LIMIT ?",
+            (PENDING, now, limit)
+        ).fetchall()
+        return [
+            {
+                'key': (source_message_id, pokemon_index, channel_id),
+                'channel_id': channel_id,
+                'payload': json.loads(payload),
+                'attempts': attempts
+            }
+            for source_message_id, pokemon_index, channel_id, payload, attempts in rows
+        ]
+
+    def _read_next_due(self):
+        self._open()
+        row = self._conn.execute(
+            "SELECT MIN(next_attempt_at) FROM outbox WHERE status = ?", (PENDING,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _update_rows(self, keys, status, attempts_delta, next_attempt_at, error):
+        self._open()
+        with self._conn:
+            self._conn.executemany(
+                "UPDATE outbox SET status = ?, attempts = attempts + ?, next_attempt_at = ?, last_error = ? "
+                "WHERE source_message_id = ? AND pokemon_index = ? AND channel_id = ?",
+                [(status, attempts_delta, next_attempt_at, error, *key) for key in keys]
+            )
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._writer, func, *args)
+
+    async def enqueue(self, source_message_id, items):
+        """Queue (pokemon_index, channel_id, payload) items for one source message
+
+        Returns how many were queued - items already pending or sent are skipped,
+        failed ones are queued again.
+        """
+        now = time.time()
+        rows = [
+            (source_message_id, pokemon_index, channel_id, json.dumps(payload), PENDING, now, now)
+            for pokemon_index, channel_id, payload in items
+        ]
+        if not rows:
+            return 0
+        return await self._run(self._insert_rows, rows)
+
+    async def due(self, limit=50):
+        return await self._run(self._read_due, time.time(), limit)
+
+    async def next_due(self):
+        """Timestamp of the earliest pending row, or None if the queue is empty"""
+        return await self._run(self._read_next_due)
+
+    async def mark_sent(self, keys):
+        await self._run(self._update_rows, keys, SENT, 1, 0, None)
+
+    async def mark_retry(self, keys, next_attempt_at, error):
+        await self._run(self._update_rows, keys, PENDING, 1, next_attempt_at, error)
+
+    async def mark_failed(self, keys, error):
+        await self._run(self._update_rows, keys, FAILED, 1, 0, error)
+
+    async def purge(self):
+        """Forget sent and failed rows older than the retention window"""
+        await self._run(self._purge_rows, time.time())
+
+    def close(self):
+        try:
+            if self._conn is not None:
+                self._writer.submit(self._conn.close).result()
+        except Exception as e:
+            print(f"Error closing starboard outbox: {e}")
+        finally:
+            self._writer.shutdown(wait=True)
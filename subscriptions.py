@@ -0,0 +1,433 @@
+# subscriptions.py - per-guild in-memory model of who wants to be pinged for what
+import asyncio
+import weakref
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from pymongo.errors import OperationFailure
+from utils import normalize_pokemon_name
+
+# Collections that make up a guild's ping subscriptions
+WATCHED_COLLECTIONS = (
+    'collections',
+    'shiny_hunts',
+    'collection_afk_users',
+    'shiny_hunt_afk_users',
+    'rare_pings',
+    'guild_settings'
+)
+
+# Per-collection filter and projection used when loading a guild
+GUILD_QUERIES = (
+    ('collections', {"pokemon": {"$exists": True, "$ne": []}}, {"user_id": 1, "pokemon": 1}),
+    ('shiny_hunts', {"pokemon": {"$exists": True}}, {"user_id": 1, "pokemon": 1, "normalized_pokemon": 1}),
+    ('collection_afk_users', {"afk": True}, {"user_id": 1}),
+    ('shiny_hunt_afk_users', {"afk": True}, {"user_id": 1}),
+    ('rare_pings', {"enabled": True}, {"user_id": 1}),
+    ('guild_settings', {}, {"rare_role_id": 1, "regional_role_id": 1})
+)
+
+def _match_key(pokemon_name):
+    """Normalized lowercase key collections and hunts are matched on"""
+    return normalize_pokemon_name(pokemon_name).lower()
+
+class UserIdSet:
+    """Sorted array of Discord user ids - 8 bytes per id and allocation-free membership tests"""
+    __slots__ = ('_ids',)
+
+    def __init__(self, user_ids=()):
+        self._ids = array('Q', sorted(set(user_ids)))
+
+    def __contains__(self, user_id):
+        i = bisect_left(self._ids, user_id)
+        return i < len(self._ids) and self._ids[i] == user_id
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, user_id):
+        i = bisect_left(self._ids, user_id)
+        if i == len(self._ids) or self._ids[i] != user_id:
+            self._ids.insert(i, user_id)
+
+    def discard(self, user_id):
+        i = bisect_left(self._ids, user_id)
+        if i < len(self._ids) and self._ids[i] == user_id:
+            del self._ids[i]
+
+class GuildSubscriptions:
+    """Collections, shiny hunts, AFK flags and rare pings for one guild
+
+    Every setter takes the full new state for one user, so applying the same
+    change twice (our own write and then its change stream event) is harmless.
+    """
+    __slots__ = (
+        'user_collections', 'collectors', 'user_hunts', 'hunters',
+        'collection_afk', 'shiny_hunt_afk', 'rare_pings', 'settings', 'doc_owners'
+    )
+
+    def __init__(self):
+        self.user_collections = {}   # user_id -> set of normalized pokemon names
+        self.collectors = {}         # normalized pokemon name -> set of user_ids
+        self.user_hunts = {}         # user_id -> normalized pokemon name
+        self.hunters = {}            # normalized pokemon name -> set of user_ids
+        self.collection_afk = UserIdSet()  # user_ids with collection pings off
+        self.shiny_hunt_afk = UserIdSet()  # user_ids with shiny hunt pings off
+        self.rare_pings = UserIdSet()      # user_ids with rare pings on
+        self.settings = {}                 # guild_settings fields (rare_role_id, regional_role_id)
+        self.doc_owners = {}               # (collection name, _id) -> user_id, for delete events
+
+    # ===== UPDATES =====
+    def set_collection(self, user_id, pokemon_names):
+        """Replace a user's collection"""
+        self._set_collection_keys(user_id, {_match_key(name) for name in pokemon_names or ()})
+
+    def add_to_collection(self, user_id, pokemon_names):
+        """Add names to a user's collection"""
+        added = {_match_key(name) for name in pokemon_names}
+        self._set_collection_keys(user_id, self.user_collections.get(user_id, set()) | added)
+
+    def remove_from_collection(self, user_id, pokemon_names):
+        """Remove names from a user's collection"""
+        removed = {_match_key(name) for name in pokemon_names}
+        self._set_collection_keys(user_id, self.user_collections.get(user_id, set()) - removed)
+
+    def _set_collection_keys(self, user_id, new_keys):
+        # Only the difference touches the inverted index
+        old_keys = self.user_collections.get(user_id, set())
+        for key in old_keys - new_keys:
+            self._discard(self.collectors, key, user_id)
+        for key in new_keys - old_keys:
+            self.collectors.setdefault(key, set()).add(user_id)
+
+        if new_keys:
+            self.user_collections[user_id] = new_keys
+        else:
+            self.user_collections.pop(user_id, None)
+
+    def set_hunt(self, user_id, pokemon_name):
+        """Set (or with None, clear) a user's shiny hunt"""
+        old_key = self.user_hunts.pop(user_id, None)
+        if old_key is not None:
+            self._discard(self.hunters, old_key, user_id)
+
+        if pokemon_name:
+            key = _match_key(pokemon_name)
+            self.user_hunts[user_id] = key
+            self.hunters.setdefault(key, set()).add(user_id)
+
+    def set_flag(self, flag, user_id, enabled):
+        """Set a user's membership in one of the AFK / rare ping sets"""
+        users = getattr(self, flag)
+        if enabled:
+            users.add(user_id)
+        else:
+            users.discard(user_id)
+
+    @staticmethod
+    def _discard(index, key, user_id):
+        users = index.get(key)
+        if users:
+            users.discard(user_id)
+            if not users:
+                del index[key]
+
+    # ===== LOOKUPS =====
+    def collectors_for(self, match_keys):
+        """User ids collecting any of match_keys, minus collection AFK users"""
+        collectors = []
+        seen = set()
+        for key in match_keys:
+            for user_id in self.collectors.get(key, ()):
+                if user_id not in self.collection_afk and user_id not in seen:
+                    seen.add(user_id)
+                    collectors.append(user_id)
+        return collectors
+
+    def hunters_for(self, match_keys):
+        """(user_id, is_afk) for users hunting any of match_keys"""
+        hunters = []
+        for key in match_keys:
+            for user_id in self.hunters.get(key, ()):
+                hunters.append((user_id, user_id in self.shiny_hunt_afk))
+        return hunters
+
+    def rare_collectors(self):
+        """User ids with rare pings on, minus collection AFK users"""
+        return [user_id for user_id in self.rare_pings if user_id not in self.collection_afk]
+
+class SubscriptionStore:
+    """LRU-bounded GuildSubscriptions for the guilds the bot has recently seen spawns in
+
+    A guild is read from Mongo once. After that it is kept current by the
+    bot's own writes (the record_* methods) and by a change stream, so spawn
+    lookups never hit the database. Everything is keyed by guild, so
+    invalidating or evicting one guild never touches another.
+    """
+    def __init__(self, get_db, max_guilds=500):
+        self._get_db = get_db
+        self.max_guilds = max_guilds
+        self._guilds = OrderedDict()  # guild_id -> GuildSubscriptions, least recently used first
+        self._loading = {}            # guild_id -> True once a change lands during its load
+        # guild_id -> lock so a guild is only loaded once at a time, dropped once no caller holds or waits on it
+        self._locks = weakref.WeakValueDictionary()
+        self._doc_owners = {}         # (collection name, _id) -> guild_id, for delete events
+        self._watch_task = None
+        self._aggregate_loads = True  # turned off if the server doesn't know $documents
+        self.loads = 0
+        self.evictions = 0
+
+    @property
+    def db(self):
+        return self._get_db()
+
+    def __len__(self):
+        return len(self._guilds)
+
+    # ===== LOADING =====
+    async def get(self, guild_id):
+        """Get a guild's subscriptions, loading them on first use"""
+        guild = self._guilds.get(guild_id)
+        if guild is not None:
+            self._guilds.move_to_end(guild_id)
+            return guild
+
+        lock = self._locks.setdefault(guild_id, asyncio.Lock())
+        async with lock:
+            guild = self._guilds.get(guild_id)
+            if guild is not None:
+                return guild
+
+            self._loading[guild_id] = False
+            try:
+                guild = await self._load(guild_id)
+            finally:
+                changed = self._loading.pop(guild_id, False)
+
+            # Something changed while we were reading, so this snapshot may be stale - use it once but don't keep it
+            if not changed:
+                self._store(guild_id, guild)
+            return guild
+
+    def _store(self, guild_id, guild):
+        """Keep a loaded guild, evicting the least recently used ones past max_guilds"""
+        self._guilds[guild_id] = guild
+        for key in guild.doc_owners:
+            self._doc_owners[key] = guild_id
+
+        while len(self._guilds) > self.max_guilds:
+            _, evicted = self._guilds.popitem(last=False)
+            self._forget(evicted)
+            self.evictions += 1
+
+    def invalidate(self, guild_id):
+        """Drop one guild so it is reloaded on next use"""
+        if guild_id in self._loading:
+            self._loading[guild_id] = True
+        guild = self._guilds.pop(guild_id, None)
+        if guild is not None:
+            self._forget(guild)
+
+    def _forget(self, guild):
+        """Drop the delete-event lookups for a guild that is no longer loaded"""
+        for key in guild.doc_owners:
+            self._doc_owners.pop(key, None)
+
+    def clear(self):
+        """Drop every loaded guild"""
+        for guild_id in list(self._loading):
+            self._loading[guild_id] = True
+        self._guilds.clear()
+        self._doc_owners.clear()
+
+    async def _load(self, guild_id):
+        """Read all of a guild's subscription documents and settings in one round-trip"""
+        self.loads += 1
+        if self._aggregate_loads:
+            try:
+                return self._build(await self._load_aggregated(guild_id))
+            except OperationFailure as e:
+                # $documents needs MongoDB 5.1+, and a huge guild can pass the 16MB result limit
+                print(f"Aggregated guild load failed, falling back to parallel queries: {e}")
+                if e.code == 40324:  # Unrecognized pipeline stage
+                    self._aggregate_loads = False
+        return self._build(await self._load_parallel(guild_id))
+
+    async def _load_aggregated(self, guild_id):
+        """One aggregation that $lookups every subscription collection for the guild"""
+        pipeline = [{"$documents": [{"guild_id": guild_id}]}]
+        for collection_name, match, projection in GUILD_QUERIES:
+            pipeline.append({"$lookup": {
+                "from": collection_name,
+                "pipeline": [
+                    {"$match": {"guild_id": guild_id, **match}},
+                    {"$project": projection}
+                ],
+                "as": collection_name
+            }})
+
+        results = await self.db.aggregate(pipeline).to_list(length=1)
+        return results[0] if results else {}
+
+    async def _load_parallel(self, guild_id):
+        """One query per collection, run concurrently"""
+        db = self.db
+        results = await asyncio.gather(*(
+            db[collection_name].find({"guild_id": guild_id, **match}, projection).to_list(length=None)
+            for collection_name, match, projection in GUILD_QUERIES
+        ))
+        return {query[0]: result for query, result in zip(GUILD_QUERIES, results)}
+
+    def _build(self, docs):
+        """Build a GuildSubscriptions from raw documents keyed by collection name"""
+        guild = GuildSubscriptions()
+        collections = docs.get('collections', [])
+        hunts = docs.get('shiny_hunts', [])
+
+        for doc in collections:
+            self._remember_owner(guild, 'collections', doc)
+            guild.set_collection(doc['user_id'], doc.get('pokemon', []))
+
+        for doc in hunts:
+            self._remember_owner(guild, 'shiny_hunts', doc)
+            guild.set_hunt(doc['user_id'], doc.get('normalized_pokemon') or doc.get('pokemon'))
+
+        for collection_name, flag in (
+            ('collection_afk_users', 'collection_afk'),
+            ('shiny_hunt_afk_users', 'shiny_hunt_afk'),
+            ('rare_pings', 'rare_pings')
+        ):
+            flag_docs = docs.get(collection_name, [])
+            for doc in flag_docs:
+                self._remember_owner(guild, collection_name, doc)
+            # Sort once instead of inserting ids one by one
+            setattr(guild, flag, UserIdSet(doc['user_id'] for doc in flag_docs))
+
+        settings_docs = docs.get('guild_settings', [])
+        if settings_docs:
+            guild.doc_owners[('guild_settings', settings_docs[0]['_id'])] = None
+            guild.settings = self._settings_fields(settings_docs[0])
+
+        return guild
+
+    @staticmethod
+    def _settings_fields(doc):
+        return {key: doc.get(key) for key in ('rare_role_id', 'regional_role_id')}
+
+    @staticmethod
+    def _remember_owner(guild, collection_name, doc):
+        if '_id' in doc and 'user_id' in doc:
+            guild.doc_owners[(collection_name, doc['_id'])] = doc['user_id']
+
+    # ===== OUR OWN WRITES =====
+    def _loaded(self, guild_id):
+        """Note a change to the guild and return its model if it is loaded"""
+        if guild_id in self._loading:
+            self._loading[guild_id] = True
+        return self._guilds.get(guild_id)
+
+    def record_collection_add(self, guild_id, user_id, pokemon_names):
+        guild = self._loaded(guild_id)
+        if guild is not None:
+            guild.add_to_collection(user_id, pokemon_names)
+
+    def record_collection_remove(self, guild_id, user_id, pokemon_names):
+        guild = self._loaded(guild_id)
+        if guild is not None:
+            guild.remove_from_collection(user_id, pokemon_names)
+
+    def record_collection_clear(self, guild_id, user_id):
+        guild = self._loaded(guild_id)
+        if guild is not None:
+            guild.set_collection(user_id, ())
+
+    def record_hunt(self, guild_id, user_id, pokemon_name):
+        guild = self._loaded(guild_id)
+        if guild is not None:
+            guild.set_hunt(user_id, pokemon_name)
+
+    def record_flag(self, guild_id, user_id, flag, enabled):
+        guild = self._loaded(guild_id)
+        if guild is not None:
+            guild.set_flag(flag, user_id, enabled)
+
+    def record_settings(self, guild_id, **fields):
+        guild = self._loaded(guild_id)
+        if guild is not None:
+            guild.settings.update(fields)
+
+    # ===== CHANGE STREAM =====
+    def start_watching(self):
+        """Start following changes made outside this process (dashboard edits, other instances)"""
+        if self._watch_task is None and self.db is not None:
+            self._watch_task = asyncio.create_task(self._watch())
+
+    def stop_watching(self):
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            self._watch_task = None
+
+    async def _watch(self):
+        """Apply change stream events to loaded guilds, reconnecting on errors"""
+        pipeline = [{"$match": {"ns.coll": {"$in": list(WATCHED_COLLECTIONS)}}}]
+        while True:
+            try:
+                async with self.db.watch(pipeline, full_document="updateLookup") as stream:
+                    print("✅ Watching subscription changes")
+                    async for change in stream:
+                        self.apply_change(change)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Change streams need a replica set - standalone servers only get our own writes
+                if "replica set" in str(e).lower() or getattr(e, 'code', None) == 40573:
+                    print("Change streams not supported by this MongoDB deployment, using local updates only")
+                    return
+                print(f"Subscription change stream error: {e}")
+
+            # Events may have been missed while disconnected, so reload guilds on next use
+            self.clear()
+            await asyncio.sleep(30)
+
+    def apply_change(self, change):
+        """Apply one change stream event"""
+        collection_name = change.get('ns', {}).get('coll')
+        operation = change.get('operationType')
+        doc_id = change.get('documentKey', {}).get('_id')
+        doc = change.get('fullDocument')
+        owner_key = (collection_name, doc_id)
+
+        if doc is not None and 'guild_id' in doc and ('user_id' in doc or collection_name == 'guild_settings'):
+            guild_id, user_id = doc['guild_id'], doc.get('user_id')
+            guild = self._loaded(guild_id)
+            if guild is None:
+                return
+            guild.doc_owners[owner_key] = user_id
+            self._doc_owners[owner_key] = guild_id
+        elif operation == 'delete' and owner_key in self._doc_owners:
+            guild_id = self._doc_owners.pop(owner_key)
+            guild = self._loaded(guild_id)
+            if guild is None:
+                return
+            if owner_key not in guild.doc_owners:
+                return
+            user_id = guild.doc_owners.pop(owner_key)
+            doc = {}
+        else:
+            return  # Updated then deleted before the lookup, or a document from a guild we haven't loaded
+
+        if collection_name == 'collections':
+            guild.set_collection(user_id, doc.get('pokemon', []))
+        elif collection_name == 'shiny_hunts':
+            guild.set_hunt(user_id, doc.get('normalized_pokemon') or doc.get('pokemon'))
+        elif collection_name == 'collection_afk_users':
+            guild.set_flag('collection_afk', user_id, bool(doc.get('afk')))
+        elif collection_name == 'shiny_hunt_afk_users':
+            guild.set_flag('shiny_hunt_afk', user_id, bool(doc.get('afk')))
+        elif collection_name == 'rare_pings':
+            guild.set_flag('rare_pings', user_id, bool(doc.get('enabled')))
+        elif collection_name == 'guild_settings':
+            guild.settings = self._settings_fields(doc)
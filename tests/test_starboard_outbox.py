@@ -0,0 +1,41 @@
+import asyncio
+from starboard_outbox import StarboardOutbox
+
+PAYLOAD = {'embeds': [{'title': 'Pikachu'}], 'buttons': []}
+
+def _run(outbox, coro):
+    try:
+        return asyncio.run(coro)
+    finally:
+        outbox.close()
+
+def test_pending_and_sent_keys_are_not_queued_again(tmp_path):
+    outbox = StarboardOutbox(str(tmp_path / "outbox.db"))
+
+    async def scenario():
+        assert await outbox.enqueue(1, [(0, 10, PAYLOAD)]) == 1
+        assert await outbox.enqueue(1, [(0, 10, PAYLOAD)]) == 0
+        await outbox.mark_sent([(1, 0, 10)])
+        assert await outbox.enqueue(1, [(0, 10, PAYLOAD)]) == 0
+        assert await outbox.due() == []
+
+    _run(outbox, scenario())
+
+def test_failed_key_can_be_queued_again(tmp_path):
+    outbox = StarboardOutbox(str(tmp_path / "outbox.db"))
+    new_payload = {'embeds': [{'title': 'Raichu'}], 'buttons': []}
+
+    async def scenario():
+        await outbox.enqueue(1, [(0, 10, PAYLOAD)])
+        await outbox.mark_retry([(1, 0, 10)], 0, "timeout")
+        await outbox.mark_failed([(1, 0, 10)], "Missing Permissions")
+        assert await outbox.due() == []
+
+        assert await outbox.enqueue(1, [(0, 10, new_payload)]) == 1
+        rows = await outbox.due()
+        assert len(rows) == 1
+        assert rows[0]['key'] == (1, 0, 10)
+        assert rows[0]['attempts'] == 0
+        assert rows[0]['payload'] == new_payload
+
+    _run(outbox, scenario())
@@ -1,15 +1,10 @@
-import json
 import unicodedata
 import re
 
 def load_pokemon_data():
-    """Load Pokemon data from pokemondata.json"""
-    try:
-        with open('pokemondata.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"Failed to load pokemondata.json: {e}")
-        return []
+    """Load Pokemon data from pokemondata.json (parsed once and shared through the Pokedex)"""
+    from pokedex import get_pokedex
+    return get_pokedex().entries
 
 def normalize_pokemon_name(name):
     """
@@ -38,6 +33,12 @@ def find_pokemon_by_name(name, pokemon_data):
     if not name or not pokemon_data:
         return None
 
+    # Use the prebuilt index when searching the shared Pokedex data
+    from pokedex import get_pokedex
+    pokedex = get_pokedex()
+    if pokemon_data is pokedex.entries:
+        return pokedex.find_by_name(name)
+
     name_lower = name.lower().strip()
 
     for pokemon in pokemon_data:
@@ -66,6 +67,12 @@ def find_pokemon_by_name_flexible(search_name, pokemon_data):
     if not search_name or not pokemon_data:
         return None
 
+    # Use the precomputed normalized index when searching the shared Pokedex data
+    from pokedex import get_pokedex
+    pokedex = get_pokedex()
+    if pokemon_data is pokedex.entries:
+        return pokedex.find_by_name_flexible(search_name)
+
     # Normalize the search name
     normalized_search = normalize_pokemon_name(search_name).lower()
 
@@ -92,6 +99,11 @@ def find_pokemon_by_name_flexible(search_name, pokemon_data):
 
 def get_pokemon_variants(base_pokemon_name, pokemon_data):
     """Get all variants of a Pokemon (including the base form)"""
+    from pokedex import get_pokedex
+    pokedex = get_pokedex()
+    if pokemon_data is pokedex.entries:
+        return pokedex.get_variants(base_pokemon_name)
+
     variants = []
     base_pokemon_name_lower = base_pokemon_name.lower()
     for pokemon in pokemon_data:
@@ -133,6 +145,20 @@ def is_rare_pokemon(pokemon):
 
     return is_rare
 
+def get_ping_role_mention(pokemon, rare_role_id, regional_role_id):
+    """Role ping line for a spawn based on its rarity, or None"""
+    if not pokemon:
+        return None
+
+    if is_rare_pokemon(pokemon) and rare_role_id:
+        return f"Rare Ping: <@&{rare_role_id}>"
+
+    rarity = pokemon.get('rarity', '').lower()
+    if rarity == "regional" and regional_role_id:
+        return f"Regional Ping: <@&{regional_role_id}>"
+
+    return None
+
 async def get_image_url_from_message(message):
     """Extract image URL from message attachments or embeds"""
     image_url = None